@@ -0,0 +1,223 @@
+"""
+Running Occupancy Aggregates for the Parking API
+Per-lot hour-of-week and per-zone daily rollups, built once when data loads and
+updated in O(1) per ingested reading, so analytics never scan the history
+"""
+import threading
+import numpy as np
+
+HOUR_NS = 3600 * 10 ** 9
+DAY_NS = 24 * HOUR_NS
+HOURS_PER_WEEK = 7 * 24
+
+# Rows processed at a time while building from the history (bounds temporary memory)
+BUILD_CHUNK_ROWS = 1 << 22
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def hour_of_week(ns):
+    """Hour of the week (Monday 00:00 = 0) of int64 nanosecond timestamps"""
+    days = ns // DAY_NS
+    return ((days + 3) % 7) * 24 + (ns // HOUR_NS) % 24  # 1970-01-01 was a Thursday
+
+
+class RollupTable:
+    """Count, sum and peak of occupancy per cell of a flat (rows x cols) grid"""
+
+    def __init__(self, rows, cols):
+        self.shape = (rows, cols)
+        self.counts = np.zeros(rows * cols, dtype=np.int64)
+        self.sums = np.zeros(rows * cols, dtype=np.float64)
+        self.peaks = np.full(rows * cols, -np.inf, dtype=np.float64)
+
+    def add_many(self, cells, rates):
+        size = len(self.counts)
+        self.counts += np.bincount(cells, minlength=size)
+        self.sums += np.bincount(cells, weights=rates, minlength=size)
+        np.maximum.at(self.peaks, cells, rates)
+
+    def add(self, cell, rate):
+        self.counts[cell] += 1
+        self.sums[cell] += rate
+        if rate > self.peaks[cell]:
+            self.peaks[cell] = rate
+
+    def add_columns(self, n):
+        """Widen the grid by `n` empty columns (new days)"""
+        rows, cols = self.shape
+        pad = lambda values, fill: np.concatenate((values.reshape(rows, cols), np.full((rows, n), fill, values.dtype)),
+                                                  axis=1).ravel()
+        self.counts, self.sums, self.peaks = pad(self.counts, 0), pad(self.sums, 0.0), pad(self.peaks, -np.inf)
+        self.shape = (rows, cols + n)
+
+    def grid(self):
+        """(counts, sums, peaks) reshaped to (rows, cols)"""
+        return tuple(values.reshape(self.shape) for values in (self.counts, self.sums, self.peaks))
+
+
+def rollup(counts, sums, peaks, axis=None):
+    """Collapse grid cells into (count, mean, peak); mean and peak are NaN where there are no readings"""
+    count = counts.sum(axis=axis)
+    total = sums.sum(axis=axis)
+    peak = peaks.max(axis=axis) if peaks.size else np.float64(-np.inf)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    return count, np.where(count > 0, mean, np.nan), np.where(count > 0, peak, np.nan)
+
+
+def _value(x):
+    return None if np.isnan(x) else float(x)
+
+
+class OccupancyAggregates:
+    """Occupancy rollups over every reading the store has seen
+
+    Two tables are kept: lot x hour-of-week (lot, zone and whole-network means
+    and peaks are sums over it) and zone x day. Readings evicted from the live
+    ring buffers stay counted.
+    """
+
+    def __init__(self, lot_ids, lot_zones, first_day=None, n_days=0):
+        self.lot_ids = list(lot_ids)
+        self.zones = sorted(set(lot_zones))
+        zone_codes = {zone: i for i, zone in enumerate(self.zones)}
+        self.lot_zone = np.array([zone_codes[zone] for zone in lot_zones], dtype=np.int64)
+
+        self.weekly = RollupTable(len(self.lot_ids), HOURS_PER_WEEK)
+        self.first_day = first_day  # Days since the epoch of the daily table's first column
+        self.daily = RollupTable(len(self.zones), n_days)
+        self.current = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store):
+        """Build from a store's history in chunks of whole lots"""
+        lot_zones = [store.lot_info[lot_id]['zone_type'] for lot_id in store.lot_ids]
+        if store.n_base_records == 0:
+            return cls(store.lot_ids, lot_zones)
+
+        first_day = int(np.datetime64(store.start_time, 'ns').astype(np.int64) // DAY_NS)
+        last_day = int(np.datetime64(store.latest_time, 'ns').astype(np.int64) // DAY_NS)
+        aggregates = cls(store.lot_ids, lot_zones, first_day, last_day - first_day + 1)
+
+        n_days = aggregates.daily.shape[1]
+        bounds = [store.offsets[lot_id] for lot_id in store.lot_ids]
+        block_start = 0
+        while block_start < len(bounds):
+            # Group consecutive lots until the chunk is full (always at least one lot)
+            block_end = block_start + 1
+            while block_end < len(bounds) and bounds[block_end][1] - bounds[block_start][0] <= BUILD_CHUNK_ROWS:
+                block_end += 1
+
+            start, end = bounds[block_start][0], bounds[block_end - 1][1]
+            sizes = [e - s for s, e in bounds[block_start:block_end]]
+            codes = np.repeat(np.arange(block_start, block_end), sizes)
+
+            ns = store.timestamps[start:end].astype('datetime64[ns]').view(np.int64)
+            rates = np.asarray(store.columns['occupancy_rate'][start:end], dtype=np.float64)
+            aggregates.weekly.add_many(codes * HOURS_PER_WEEK + hour_of_week(ns), rates)
+            aggregates.daily.add_many(aggregates.lot_zone[codes] * n_days + (ns // DAY_NS - first_day), rates)
+            block_start = block_end
+
+        return aggregates
+
+    def add(self, lot_code, timestamp, rate):
+        """Count one ingested reading"""
+        ns = int(np.datetime64(timestamp, 'ns').astype(np.int64))
+        day = ns // DAY_NS
+        rate = float(rate)
+
+        with self.lock:
+            if self.first_day is None:
+                self.first_day = day
+            if day >= self.first_day + self.daily.shape[1]:
+                self.daily.add_columns(day - self.first_day - self.daily.shape[1] + 1)
+
+            self.weekly.add(lot_code * HOURS_PER_WEEK + int(hour_of_week(ns)), rate)
+            if day >= self.first_day:
+                self.daily.add(int(self.lot_zone[lot_code]) * self.daily.shape[1] + day - self.first_day, rate)
+
+    def update_current(self, snapshot):
+        """Statistics of the latest-row snapshot, recomputed whenever it is rebuilt"""
+        if len(snapshot) == 0:
+            self.current = {}
+            return
+
+        rates = snapshot['occupancy_rate'].to_numpy(dtype=np.float64)
+        self.current = {
+            'average_occupancy': float(rates.mean()),
+            'busiest_lot': snapshot['lot_name'].iloc[int(np.argmax(rates))],
+            'most_available_lot': snapshot['lot_name'].iloc[int(np.argmin(rates))],
+            'total_capacity': int(snapshot['capacity'].sum()),
+            'total_available': int(snapshot['available_slots'].sum())
+        }
+
+    def overall(self):
+        """Readings, mean and peak occupancy over the whole history"""
+        with self.lock:
+            count, mean, peak = rollup(*self.weekly.grid())
+        return {'readings': int(count), 'average_occupancy': _value(mean), 'peak_occupancy': _value(peak)}
+
+    def lots(self):
+        """Mean and peak occupancy of every lot"""
+        with self.lock:
+            counts, means, peaks = rollup(*self.weekly.grid(), axis=1)
+        return [
+            {'lot_id': lot_id, 'zone_type': self.zones[self.lot_zone[i]], 'readings': int(counts[i]),
+             'average_occupancy': _value(means[i]), 'peak_occupancy': _value(peaks[i])}
+            for i, lot_id in enumerate(self.lot_ids)
+        ]
+
+    def by_zone(self):
+        """Mean and peak occupancy of every zone"""
+        with self.lock:
+            counts, sums, peaks = self.weekly.grid()
+            results = []
+            for zone_code, zone in enumerate(self.zones):
+                members = self.lot_zone == zone_code
+                count, mean, peak = rollup(counts[members], sums[members], peaks[members])
+                results.append({'zone_type': zone, 'lots': int(members.sum()), 'readings': int(count),
+                                'average_occupancy': _value(mean), 'peak_occupancy': _value(peak)})
+        return results
+
+    def profile(self, lot_codes=None, period='week'):
+        """Mean and peak occupancy per hour of the week (or of the day) over the given lots (default all)"""
+        with self.lock:
+            counts, sums, peaks = self.weekly.grid()
+            if lot_codes is not None:
+                counts, sums, peaks = counts[lot_codes], sums[lot_codes], peaks[lot_codes]
+            if period == 'day':
+                counts, means, peaks = rollup(*(values.reshape(-1, 7, 24) for values in (counts, sums, peaks)),
+                                              axis=(0, 1))
+            else:
+                counts, means, peaks = rollup(counts, sums, peaks, axis=0)
+
+        points = []
+        for i in range(len(counts)):
+            point = {'hour': i % 24}
+            if period == 'week':
+                point['day_of_week'] = i // 24
+                point['day_name'] = DAY_NAMES[i // 24]
+            point.update(readings=int(counts[i]), average_occupancy=_value(means[i]), peak_occupancy=_value(peaks[i]))
+            points.append(point)
+        return points
+
+    def days(self, zone=None, last=None):
+        """Daily readings, mean and peak occupancy (network-wide or for one zone), oldest first"""
+        with self.lock:
+            if self.first_day is None:
+                return []
+            counts, sums, peaks = self.daily.grid()
+            if zone is not None:
+                row = self.zones.index(zone)
+                counts, sums, peaks = counts[row:row + 1], sums[row:row + 1], peaks[row:row + 1]
+            counts, means, peaks = rollup(counts, sums, peaks, axis=0)
+            first_day = self.first_day
+
+        start = max(len(counts) - last, 0) if last else 0
+        return [
+            {'date': str(np.datetime64(first_day + i, 'D')), 'readings': int(counts[i]),
+             'average_occupancy': _value(means[i]), 'peak_occupancy': _value(peaks[i])}
+            for i in range(start, len(counts))
+        ]
@@ -0,0 +1,140 @@
+"""
+Micro-Batching Inference Scheduler
+Collects concurrent prediction requests for a few milliseconds and runs them as one batch
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Upper bounds of the batch size histogram buckets (in keys)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class MicroBatcher:
+    """Runs `batch_fn(keys) -> {key: result}` on a single background thread
+
+    Callers submit keys with submit_many and get a Future. The worker takes the first waiting
+    request, keeps collecting more for up to `max_wait` seconds or until
+    `max_batch_size` keys are queued, then makes one `batch_fn` call for all
+    of them and resolves every caller's future. Keys missing from the result
+    resolve to None. Since only the worker thread calls `batch_fn`, the model
+    is never used concurrently.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=256, max_wait=0.002):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.requests = 0
+        self.keys = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.largest_batch = 0
+        self.queue_wait_total = 0.0
+        self.batch_time_total = 0.0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def _ensure_running(self):
+        """Start the worker thread (again after a fork: threads do not survive it)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    @property
+    def thread_ident(self):
+        """Ident of this process's worker thread (None before the first request)"""
+        return self._thread.ident if self._pid == os.getpid() else None
+
+    def submit_many(self, keys):
+        """Queue a request for several keys; the Future resolves to {key: result}"""
+        self._ensure_running()
+        future = Future()
+        self._queue.put((list(keys), future, time.perf_counter()))
+
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the window closes"""
+        pending = [self._queue.get()]
+        n_keys = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while n_keys < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(item)
+            n_keys += len(item[0])
+
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            keys = list(dict.fromkeys(key for item_keys, _, _ in pending for key in item_keys))
+            started = time.perf_counter()
+
+            try:
+                results = self.batch_fn(keys)
+                error = None
+            except Exception as e:
+                results, error = {}, e
+
+            finished = time.perf_counter()
+            self._record(pending, len(keys), started, finished, error)
+
+            for item_keys, future, _ in pending:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result({key: results.get(key) for key in item_keys})
+
+    def _record(self, pending, n_keys, started, finished, error):
+        with self._lock:
+            self.requests += len(pending)
+            self.keys += n_keys
+            self.batches += 1
+            self.errors += error is not None
+            self.largest_batch = max(self.largest_batch, n_keys)
+            self.queue_wait_total += sum(started - queued for _, _, queued in pending)
+            self.batch_time_total += finished - started
+
+            bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if n_keys <= bound), len(BATCH_SIZE_BUCKETS))
+            self.batch_size_counts[bucket] += 1
+
+    def stats(self):
+        """Counters for /api/status"""
+        with self._lock:
+            labels = [f'<={bound}' for bound in BATCH_SIZE_BUCKETS] + [f'>{BATCH_SIZE_BUCKETS[-1]}']
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize() if self._pid == os.getpid() else 0,
+                'max_queue_depth': self.max_queue_depth,
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': self.keys / self.batches if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'batch_sizes': dict(zip(labels, self.batch_size_counts)),
+                'mean_queue_wait_ms': 1000 * self.queue_wait_total / self.requests if self.requests else 0.0,
+                'mean_batch_ms': 1000 * self.batch_time_total / self.batches if self.batches else 0.0,
+            }
@@ -0,0 +1,78 @@
+"""
+Server-Sent Events Broadcaster
+Encodes each event once and fans it out to every connected client's queue
+"""
+import json
+import queue
+import threading
+
+
+def format_event(event, data, event_id=None):
+    """One event in the text/event-stream wire format"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.extend(f"data: {line}" for line in json.dumps(data, separators=(',', ':')).splitlines())
+    return '\n'.join(lines) + '\n\n'
+
+
+class Broadcaster:
+    """Subscribers get a queue of encoded events
+
+    The latest full snapshot is kept so new subscribers start from it, and a
+    subscriber whose queue overflows (a stalled client) is reset to it rather
+    than blocking the publisher.
+    """
+
+    def __init__(self, max_queue=64):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.snapshot = None  # Encoded 'snapshot' event
+        self.event_id = 0
+        self.published = 0
+        self.resets = 0
+
+    def subscribe(self):
+        subscriber = queue.Queue(self.max_queue)
+        with self._lock:
+            if self.snapshot is not None:
+                subscriber.put(self.snapshot)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data, snapshot=None):
+        """Queue an event for every subscriber; `snapshot` (full state) replaces the one new subscribers get"""
+        with self._lock:
+            self.event_id += 1
+            message = format_event(event, data, self.event_id)
+            if snapshot is not None:
+                self.snapshot = format_event('snapshot', snapshot, self.event_id)
+
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self._reset(subscriber)
+            self.published += 1
+
+    def _reset(self, subscriber):
+        """Drop a lagging subscriber's backlog and resend the full snapshot"""
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        if self.snapshot is not None:
+            subscriber.put_nowait(self.snapshot)
+        self.resets += 1
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def stats(self):
+        return {'subscribers': len(self), 'events_published': self.published, 'lagging_resets': self.resets}
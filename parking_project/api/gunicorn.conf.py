@@ -0,0 +1,59 @@
+"""
+Gunicorn Configuration for the Parking API
+Preloads the app in the master process and forks workers that share its memory
+
+Usage (from the api/ directory): gunicorn -c gunicorn.conf.py wsgi:app
+Settings come from environment variables:
+    PARKING_BIND      address to listen on (default 127.0.0.1:5000)
+    PARKING_WORKERS   worker processes (default: one per CPU core)
+    PARKING_THREADS   threads per worker for ordinary requests (default 4)
+    PARKING_STREAM_THREADS  extra threads per worker for event streams (default 16)
+    PARKING_TIMEOUT   worker timeout in seconds (default 60)
+With several workers, PARKING_MODEL_WATCH_SECONDS defaults to 5 (see below).
+"""
+import gc
+import multiprocessing
+import os
+
+# One math thread per worker: workers already use every core, more threads only oversubscribe
+# (set before the preloaded app imports NumPy)
+for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(var, '1')
+
+bind = os.environ.get('PARKING_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('PARKING_WORKERS', multiprocessing.cpu_count()))
+request_threads = int(os.environ.get('PARKING_THREADS', 4))
+
+# Each open /api/parking/stream holds a thread for its whole lifetime, so streams get threads of
+# their own on top of the request threads, and main.py caps streams at that many per worker
+stream_threads = int(os.environ.get('PARKING_STREAM_THREADS', 16))
+os.environ.setdefault('PARKING_MAX_STREAM_CLIENTS', str(stream_threads))
+threads = request_threads + stream_threads
+worker_class = 'gthread'
+
+# Each worker holds its own model; an admin reload or rollback only swaps the worker that
+# handled it (and publishes the version), so the other workers follow models/CURRENT
+if workers > 1:
+    os.environ.setdefault('PARKING_MODEL_WATCH_SECONDS', '5')
+timeout = int(os.environ.get('PARKING_TIMEOUT', 60))
+
+# Load data and model once in the master; forked workers share the pages copy-on-write
+preload_app = True
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before workers are forked"""
+    import main
+
+    # Move everything loaded so far out of the collector's reach, so GC passes
+    # in the workers do not write to (and un-share) the preloaded objects
+    gc.collect()
+    gc.freeze()
+
+    if main.model_backend == 'keras' and workers > 1:
+        server.log.warning("Keras backend with multiple workers: TensorFlow state is not fork-safe; "
+                           "export NumPy weights (train_model.py) or set PARKING_INFERENCE_BACKEND=numpy")
+
+    server.log.info(f"Preloaded {main.store.n_records:,} records and the {main.model_backend} model; "
+                    f"starting {workers} workers x {request_threads} threads (+{stream_threads} for streams)")
@@ -0,0 +1,145 @@
+"""
+Batched Inference Engine for Parking Prediction
+Builds one (n_lots, sequence_length, n_features) tensor and runs a single forward pass
+that returns every lot's whole forecast curve
+
+With a feature store attached (see scripts/features.py), the stored history is read
+already encoded and scaled; only lots with ingested readings are assembled from raw columns.
+"""
+import numpy as np
+
+from generate_data import SAMPLES_PER_HOUR
+from timing import StageTimer
+
+
+class BatchPredictor:
+    """Runs the occupancy model over many parking lots at once"""
+
+    def __init__(self, model, scaler, zone_encoder, model_info, backend=None, version=None):
+        self.model = model
+        self.backend = backend
+        self.version = version  # Registry version (None for unversioned artifacts)
+        self.generation = 0     # Set by the API when the predictor starts serving
+        self.scaler = scaler
+        self.zone_encoder = zone_encoder
+        self.model_info = model_info
+        self.feature_cols = list(model_info['feature_cols'])
+        self.sequence_length = int(model_info['sequence_length'])
+        self.features = None  # Pre-scaled rows of the store's history (FeatureRows), see load_features
+        
+        # Hours ahead of each model output (single-output models predict prediction_horizon steps ahead)
+        default_hours = [max(1, int(model_info.get('prediction_horizon', SAMPLES_PER_HOUR)) // SAMPLES_PER_HOUR)]
+        self.forecast_hours = [int(h) for h in model_info.get('forecast_hours', default_hours)]
+
+    def build_sequences(self, store, lot_ids, timer=None):
+        """Collect the last `sequence_length` rows of every requested lot
+
+        Returns the lot ids that had enough history, the raw feature tensor
+        of shape (n_lots, sequence_length, n_features) and the matching
+        occupancy windows used for the confidence score.
+        """
+        timer = timer or StageTimer()
+        stored_cols = [col for col in self.feature_cols if col in store.columns]
+        with timer.stage('data_lookup'):
+            complete, windows = store.windows(lot_ids, self.sequence_length, set(stored_cols) | {'occupancy_rate'})
+
+        if not complete:
+            return [], np.empty((0, self.sequence_length, len(self.feature_cols))), np.empty((0, self.sequence_length))
+
+        with timer.stage('feature_assembly'):
+            if 'zone_encoded' in self.feature_cols and 'zone_encoded' not in windows:
+                encoded = self.zone_codes(store, complete)
+                windows['zone_encoded'] = np.repeat(encoded[:, None], self.sequence_length, axis=1)
+
+            X = np.stack([windows[col].astype(np.float32) for col in self.feature_cols], axis=-1)
+
+        return complete, X, windows['occupancy_rate']
+
+    def zone_codes(self, store, lot_ids):
+        """Encoded zone of each lot (zone is constant per lot, so encode once per lot instead of per row)"""
+        return self.zone_encoder.transform([store.lot_info[lot_id]['zone_type'] for lot_id in lot_ids])
+
+    def load_features(self, store, feature_store):
+        """Attach the scaled rows of the store's history from a feature store, scaling whatever it lacks"""
+        encode_zone = 'zone_encoded' in self.feature_cols and 'zone_encoded' not in store.columns
+        zones = self.zone_codes(store, store.lot_ids) if encode_zone else None
+        bounds = [store.offsets[lot_id] for lot_id in store.lot_ids]
+        lot_offsets = np.concatenate(([0], np.cumsum([end - start for start, end in bounds])))
+
+        def lot_values(i, start, end):
+            start, end = bounds[i][0] + start, bounds[i][0] + end
+            return np.column_stack([
+                np.full(end - start, zones[i], dtype=np.float64) if encode_zone and col == 'zone_encoded'
+                else store.columns[col][start:end].astype(np.float64)
+                for col in self.feature_cols
+            ])
+
+        self.features = feature_store.rows(store.lot_ids, lot_offsets, lot_values, self.feature_cols,
+                                           self.scaler, self.zone_encoder)
+        return self.features.stats
+
+    def scale(self, X):
+        """Scale a whole sequence tensor in one call"""
+        n_features = X.shape[-1]
+        return self.scaler.transform(X.reshape(-1, n_features)).reshape(X.shape).astype(np.float32)
+
+    def build_inputs(self, store, lot_ids, timer=None):
+        """Scaled model inputs for the lots with enough history: (lot ids, inputs, occupancy windows)
+
+        Lots covered by the attached feature store are read pre-scaled; the others
+        (and lots with ingested readings, which the feature store does not hold) are
+        assembled from raw columns and scaled.
+        """
+        timer = timer or StageTimer()
+        if self.features is None:
+            complete, X, occupancy = self.build_sequences(store, lot_ids, timer)
+            with timer.stage('scaling'):
+                return complete, self.scale(X), occupancy
+
+        with timer.stage('data_lookup'):
+            complete, windows = store.windows(lot_ids, self.sequence_length, ['occupancy_rate'])
+        stored = np.array([lot_id in self.features and lot_id not in store.live for lot_id in complete], dtype=bool)
+
+        X = np.empty((len(complete), self.sequence_length, len(self.feature_cols)), dtype=np.float32)
+        if stored.any():
+            with timer.stage('feature_lookup'):
+                X[stored] = self.features.tails([complete[i] for i in np.flatnonzero(stored)], self.sequence_length)
+        if not stored.all():
+            _, raw, _ = self.build_sequences(store, [complete[i] for i in np.flatnonzero(~stored)], timer)
+            with timer.stage('scaling'):
+                X[~stored] = self.scale(raw)
+
+        return complete, X, windows['occupancy_rate']
+
+    def forward(self, X_scaled):
+        """Single forward pass over the batch: (n_lots, n_horizons) occupancy forecasts"""
+        return np.asarray(self.model.predict_on_batch(X_scaled)).reshape(len(X_scaled), -1)[:, :len(self.forecast_hours)]
+
+    def predict(self, store, lot_ids, timer=None):
+        """Forecast occupancy at every horizon for many lots, keyed by lot id
+
+        `forecast` holds one occupancy rate per entry of `forecast_hours`.
+        Stage durations (data_lookup, feature_lookup, feature_assembly, scaling, inference)
+        are recorded on `timer` if one is given.
+        """
+        timer = timer or StageTimer()
+        complete, X_scaled, occupancy = self.build_inputs(store, list(lot_ids), timer)
+
+        if not complete:
+            return {}
+
+        with timer.stage('inference'):
+            predictions = self.forward(X_scaled)
+
+        # Calculate confidence based on recent variability
+        recent_std = occupancy.std(axis=1, ddof=1)
+        confidence = np.maximum(0, 100 - (recent_std * 200))  # Higher std = lower confidence
+
+        return {
+            lot_id: {
+                'forecast': predictions[i].astype(float).tolist(),
+                'confidence': float(confidence[i]),
+                'current_occupancy': float(occupancy[i, -1])
+            }
+            for i, lot_id in enumerate(complete)
+        }
@@ -0,0 +1,130 @@
+"""
+Live Observation Ingestion
+Validates sensor readings and appends them to the store with incrementally computed features
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from generate_data import SAMPLES_PER_HOUR, calendar_features
+
+# Lag features and how many readings back they look (same definition as generate_data.py)
+LAG_FEATURES = {
+    'occupancy_1h_ago': SAMPLES_PER_HOUR,
+    'occupancy_3h_ago': 3 * SAMPLES_PER_HOUR,
+    'occupancy_24h_ago': 24 * SAMPLES_PER_HOUR,
+}
+
+# How far ahead of this server's clock a reading's timestamp may be (sensor clock skew)
+MAX_CLOCK_SKEW = pd.Timedelta(minutes=5)
+
+
+class ObservationError(ValueError):
+    """A single reading was rejected"""
+
+
+def parse_observation(store, obs):
+    """Validate one reading, returning (lot_id, timestamp, occupied_slots, occupancy_rate)
+
+    A reading needs a `lot_id` and either `occupied_slots` or `occupancy_rate`.
+    `timestamp` (ISO 8601) defaults to now. Stored rows are naive local time, so
+    time zone offsets are converted to this server's local time; timestamps more than
+    MAX_CLOCK_SKEW in the future are rejected.
+    """
+    if not isinstance(obs, dict):
+        raise ObservationError('Observation must be an object')
+
+    lot_id = obs.get('lot_id')
+    if not isinstance(lot_id, str) or lot_id not in store:
+        raise ObservationError(f'Unknown lot: {lot_id}')
+
+    try:
+        timestamp = pd.Timestamp(obs.get('timestamp') or pd.Timestamp.now())
+    except (TypeError, ValueError):
+        raise ObservationError(f"Invalid timestamp: {obs.get('timestamp')}")
+    if timestamp.tzinfo is not None:
+        timestamp = pd.Timestamp(timestamp.to_pydatetime().astimezone()).tz_localize(None)
+    if timestamp > pd.Timestamp(datetime.now()) + MAX_CLOCK_SKEW:
+        raise ObservationError(f'Timestamp is in the future: {timestamp.isoformat()}')
+
+    capacity = int(store.lot_info[lot_id]['capacity'])
+    if obs.get('occupied_slots') is None and obs.get('occupancy_rate') is None:
+        raise ObservationError('Observation needs occupied_slots or occupancy_rate')
+    try:
+        if obs.get('occupied_slots') is not None:
+            occupied = int(obs['occupied_slots'])
+            rate = occupied / capacity
+        else:
+            rate = float(obs['occupancy_rate'])
+            occupied = int(rate * capacity)
+    except (TypeError, ValueError):
+        raise ObservationError('occupied_slots / occupancy_rate must be numeric')
+
+    if not (0 <= occupied <= capacity and 0.0 <= rate <= 1.0):
+        raise ObservationError(f'Occupancy out of range for capacity {capacity}')
+
+    return lot_id, timestamp, occupied, rate
+
+
+def build_row(store, lot_id, timestamp, occupied, rate, hour, day_of_week, is_holiday):
+    """Feature row for a new reading, computed in O(1) from the lot's previous readings
+
+    Lags count readings, like the offline shift, so they assume the regular
+    15-minute cadence; lots with too little history use the current value.
+    """
+    capacity = int(store.lot_info[lot_id]['capacity'])
+
+    row = {
+        'timestamp': np.datetime64(timestamp, 'ns'),
+        'occupied_slots': occupied,
+        'available_slots': capacity - occupied,
+        'occupancy_rate': rate,
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'is_weekend': int(day_of_week >= 5),
+        'is_holiday': int(is_holiday),
+    }
+    for col, steps in LAG_FEATURES.items():
+        # The reading `steps` back from the new one is the steps-th newest stored row
+        previous = store.value_back(lot_id, 'occupancy_rate', steps)
+        row[col] = rate if previous is None else previous
+
+    return {col: row[col] for col in store.columns if col in row}
+
+
+def ingest_observations(store, observations):
+    """Append a batch of readings, returning (accepted count, per-reading errors)
+
+    Readings are applied in time order per lot and must be newer than the
+    lot's latest row; rejected readings are reported by their index in the batch.
+    """
+    errors, parsed = [], []
+
+    for index, obs in enumerate(observations):
+        try:
+            parsed.append((index,) + parse_observation(store, obs))
+        except ObservationError as e:
+            errors.append({'index': index, 'lot_id': obs.get('lot_id') if isinstance(obs, dict) else None,
+                           'error': str(e)})
+
+    parsed.sort(key=lambda p: (p[1], p[2], p[0]))
+    calendar = calendar_features(pd.DatetimeIndex([p[2] for p in parsed]))
+
+    accepted = 0
+    with store.lock:
+        for (index, lot_id, timestamp, occupied, rate), *features in zip(parsed, *calendar):
+            last = store.last_timestamp(lot_id)
+            if last is not None and np.datetime64(timestamp, 'ns') <= last:
+                errors.append({'index': index, 'lot_id': lot_id,
+                               'error': f'Reading at {timestamp.isoformat()} is not newer than the latest one'})
+                continue
+
+            store.append(lot_id, build_row(store, lot_id, timestamp, occupied, rate, *features))
+            accepted += 1
+
+        if accepted:
+            store.commit()
+
+    errors.sort(key=lambda e: e['index'])
+    return accepted, errors
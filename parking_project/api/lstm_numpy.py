@@ -0,0 +1,138 @@
+"""
+Pure NumPy Inference for the Parking LSTM
+Runs the exported weights of build_lstm_model without importing TensorFlow
+
+The forward pass is computed in float32 and matches keras model.predict
+within 1e-5 absolute error on the sigmoid output (checked by running this
+file directly against the saved .h5 model). Kernels of quantized weight files
+(float16 or int8, see scripts/quantization.py) stay at that precision in memory
+and are expanded to float32 for the forward pass, one layer at a time.
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from quantization import dequantize, expand, stored
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 0.5 * (1.0 + np.tanh(0.5 * x)),  # overflow-free logistic
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+}
+
+
+class NumpyLSTM:
+    """Stack of LSTM and Dense layers loaded from an exported .npz file"""
+
+    def __init__(self, layers, dtype=np.float32, precision='float32'):
+        self.layers = layers
+        self.dtype = dtype
+        self.precision = precision  # Precision the kernels are held at
+
+    @property
+    def nbytes(self):
+        """Memory held by the weights"""
+        return sum(value.nbytes for layer in self.layers for value in layer.values() if isinstance(value, np.ndarray))
+
+    def _weight(self, layer, name):
+        """A kernel as `dtype` for one forward pass"""
+        return expand(layer[name], layer[f'{name}_scale'], self.dtype)
+
+    @classmethod
+    def load(cls, path, dtype=np.float32):
+        """Load weights written by export_numpy_weights in train_model.py (or a quantized copy)"""
+        with np.load(path, allow_pickle=False) as data:
+            precision = str(data['precision']) if 'precision' in data else 'float32'
+            types = [str(t) for t in data['layer_types']]
+            layers = []
+            for i, kind in enumerate(types):
+                layer = {
+                    'type': kind,
+                    'activation': str(data['layer_activations'][i]),
+                    'bias': dequantize(data, f'layer_{i}_bias').astype(dtype),
+                }
+                for name in ('kernel', 'recurrent_kernel') if kind == 'lstm' else ('kernel',):
+                    values, scale = stored(data, f'layer_{i}_{name}')
+                    if values.dtype == np.float32:
+                        values = values.astype(dtype)
+                    layer[name], layer[f'{name}_scale'] = values, scale
+                if kind == 'lstm':
+                    layer['recurrent_activation'] = str(data['layer_recurrent_activations'][i])
+                    layer['return_sequences'] = bool(data['layer_return_sequences'][i])
+                layers.append(layer)
+        return cls(layers, dtype, precision)
+
+    def _lstm(self, x, layer):
+        """Keras LSTM forward pass (gate order: input, forget, cell, output)"""
+        n, steps, _ = x.shape
+        units = layer['recurrent_kernel'].shape[0]
+        activation = ACTIVATIONS[layer['activation']]
+        recurrent_activation = ACTIVATIONS[layer['recurrent_activation']]
+        recurrent_kernel = self._weight(layer, 'recurrent_kernel')  # Expanded once, reused every timestep
+
+        # Input projections for every timestep in one matmul
+        x_proj = x @ self._weight(layer, 'kernel') + layer['bias']
+
+        h = np.zeros((n, units), dtype=x.dtype)
+        c = np.zeros((n, units), dtype=x.dtype)
+        outputs = []
+
+        for t in range(steps):
+            z = x_proj[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if layer['return_sequences']:
+                outputs.append(h)
+
+        return np.stack(outputs, axis=1) if layer['return_sequences'] else h
+
+    def predict_on_batch(self, X):
+        """Forward pass over a (batch, timesteps, features) array"""
+        x = np.asarray(X, dtype=self.dtype)
+
+        for layer in self.layers:
+            if layer['type'] == 'lstm':
+                x = self._lstm(x, layer)
+            else:
+                x = ACTIVATIONS[layer['activation']](x @ self._weight(layer, 'kernel') + layer['bias'])
+
+        return x
+
+    def predict(self, X, verbose=0, batch_size=None):
+        """Keras-compatible alias for predict_on_batch"""
+        return self.predict_on_batch(X)
+
+
+if __name__ == '__main__':
+    # Compare against the Keras model of the published version on random inputs
+    from registry import ModelRegistry, artifact_paths
+
+    models_dir = os.path.join(os.path.dirname(__file__), '..', 'models')
+    registry = ModelRegistry(models_dir)
+    version = sys.argv[1] if len(sys.argv) > 1 else registry.current()
+    paths = registry.artifacts(version) if version else artifact_paths(models_dir)
+    weights_path, model_path = paths['weights'], paths['model']
+
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+    from tensorflow import keras
+
+    keras_model = keras.models.load_model(model_path, compile=False)
+    numpy_model = NumpyLSTM.load(weights_path)
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((256,) + tuple(keras_model.input_shape[1:])).astype(np.float32)
+
+    expected = keras_model.predict(X, verbose=0)
+    actual = numpy_model.predict_on_batch(X)
+    max_error = float(np.max(np.abs(expected - actual)))
+
+    print(f"Max absolute difference: {max_error:.2e}")
+    sys.exit(0 if max_error < 1e-5 else 1)
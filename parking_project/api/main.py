@@ -2,172 +2,689 @@
 Flask API for Real-Time Parking Prediction
 Serves predictions and current parking availability
 """
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, has_request_context, jsonify, request, send_from_directory
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import pickle
+import hmac
 import os
-from datetime import datetime, timedelta
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 
-# Suppress TensorFlow warnings
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+# Data format helpers are shared with the training scripts
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from batching import MicroBatcher
+from broadcast import Broadcaster
+from cache import LRUCache
+from columnar import read_columnar
+from features import FeatureStore
+from inference import BatchPredictor
+from ingest import ingest_observations
+from lstm_numpy import NumpyLSTM
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from prepared import PreparedResponse
+from profiling import SamplingProfiler
+from registry import ModelRegistry, artifact_paths
+from rollups import RESOLUTIONS
+from store import LotStore
+from timing import StageTimer
 
-try:
-    from tensorflow import keras
-    TENSORFLOW_AVAILABLE = True
-except ImportError:
-    TENSORFLOW_AVAILABLE = False
-    print("⚠️  TensorFlow not installed. Install with: pip install tensorflow")
+# Suppress TensorFlow warnings (TensorFlow is only imported for the keras backend)
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 app = Flask(__name__, static_folder='../web', static_url_path='')
-CORS(app)
+CORS(app, expose_headers=['ETag', 'Last-Modified'])
+
+# Request counts and latency per route (registered first so it times every other hook)
+metrics = Metrics()
+metrics.instrument(app)
 
 # Paths
 BASE_DIR = os.path.dirname(__file__)
 DATA_PATH = os.path.join(BASE_DIR, '..', 'data', 'parking_data.csv')
-MODEL_PATH = os.path.join(BASE_DIR, '..', 'models', 'parking_predictor.h5')
-SCALER_PATH = os.path.join(BASE_DIR, '..', 'models', 'scaler.pkl')
-ENCODER_PATH = os.path.join(BASE_DIR, '..', 'models', 'encoder.pkl')
-INFO_PATH = os.path.join(BASE_DIR, '..', 'models', 'model_info.pkl')
+COLUMNAR_PATH = os.path.join(BASE_DIR, '..', 'data', 'parking_data.cols')
+MODELS_DIR = os.path.join(BASE_DIR, '..', 'models')  # Versioned, see scripts/registry.py
+FEATURES_DIR = os.path.join(BASE_DIR, '..', 'data', 'features')  # Shared with training, see scripts/features.py
+
+# Read the stored history pre-scaled from the feature store (built on first use) instead of scaling per request
+FEATURE_STORE_ENABLED = os.environ.get('PARKING_FEATURE_STORE', '1') != '0'
+
+# Inference backend: 'numpy' (exported weights, no TensorFlow), 'keras', or 'auto' (numpy if exported)
+INFERENCE_BACKEND = os.environ.get('PARKING_INFERENCE_BACKEND', 'auto')
+
+# Precision the served weights are held at in memory: 'float32', or 'float16' / 'int8' for the
+# quantized copies exported by train_model.py (numpy backend; 2x / 3.7x less weight memory per
+# worker, see the accuracy report in model_info)
+MODEL_PRECISION = os.environ.get('PARKING_MODEL_PRECISION', 'float32')
+
+# Cache sizes and lifetimes (entries are also invalidated when data or model change)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PARKING_PREDICTION_CACHE_SIZE', 4096))
+RESPONSE_CACHE_SIZE = int(os.environ.get('PARKING_RESPONSE_CACHE_SIZE', 64))
+CACHE_TTL = float(os.environ.get('PARKING_CACHE_TTL', 300))
+
+# Ingested readings kept per lot (ring buffer size, default 7 days of 15-minute readings)
+LIVE_BUFFER_SIZE = int(os.environ.get('PARKING_LIVE_BUFFER_SIZE', 7 * 24 * 4))
+
+# Inference micro-batching: requests arriving within the window share one forward pass
+MICROBATCH_MAX_SIZE = int(os.environ.get('PARKING_MICROBATCH_MAX_SIZE', 256))
+MICROBATCH_WAIT_MS = float(os.environ.get('PARKING_MICROBATCH_WAIT_MS', 2))
+INFERENCE_TIMEOUT = float(os.environ.get('PARKING_INFERENCE_TIMEOUT', 10))
+
+# Poll the model registry every N seconds and hot-reload newly published versions
+# (0 = off; gunicorn.conf.py sets 5 when running several workers)
+MODEL_WATCH_SECONDS = float(os.environ.get('PARKING_MODEL_WATCH_SECONDS', 0))
+
+# Admin endpoints require this token in X-Admin-Token; without it they only accept direct local
+# requests (not ones relayed by a reverse proxy, which would otherwise all look local)
+ADMIN_TOKEN = os.environ.get('PARKING_ADMIN_TOKEN')
+
+# Batch sizes run through a new model before it serves: single requests, micro-batches, /predict/all
+WARMUP_BATCH_SIZES = (1, 8, MICROBATCH_MAX_SIZE)
+
+# Per-request sampling profiler (?profile=1, admin only); can also be toggled at runtime
+PROFILING_ENABLED = os.environ.get('PARKING_PROFILING') == '1'
+PROFILE_INTERVAL_MS = float(os.environ.get('PARKING_PROFILE_INTERVAL_MS', 1))
+
+# Most points returned per history page (longer ranges are paginated with a cursor)
+HISTORY_PAGE_SIZE = int(os.environ.get('PARKING_HISTORY_PAGE_SIZE', 5000))
+
+# Most lots accepted by the batch prediction and history endpoints
+MAX_BATCH_LOTS = int(os.environ.get('PARKING_MAX_BATCH_LOTS', 500))
+
+# Server-sent event stream: how often the publisher checks for changes (data changes
+# made in this process are pushed immediately), keep-alive interval, connection lifetime
+# (clients reconnect and resync) and the most concurrent streams per process
+STREAM_POLL_SECONDS = float(os.environ.get('PARKING_STREAM_POLL_SECONDS', 5))
+STREAM_KEEPALIVE_SECONDS = float(os.environ.get('PARKING_STREAM_KEEPALIVE_SECONDS', 5))  # Also how soon a closed client's slot frees
+STREAM_MAX_SECONDS = float(os.environ.get('PARKING_STREAM_MAX_SECONDS', 300))
+
+# A stream holds one server thread for its whole lifetime; gunicorn.conf.py adds
+# PARKING_STREAM_THREADS threads per worker for streams, so ordinary requests keep theirs
+MAX_STREAM_CLIENTS = int(os.environ.get('PARKING_MAX_STREAM_CLIENTS', os.environ.get('PARKING_STREAM_THREADS', 16)))
+
+# Maximum readings accepted per ingestion request
+MAX_OBSERVATIONS = int(os.environ.get('PARKING_MAX_OBSERVATIONS', 10000))
 
 # Global variables for loaded models
 model = None
+model_backend = None
 scaler = None
 zone_encoder = None
 model_info = None
-df_data = None
+store = None
+predictor = None
+previous_predictor = None  # Last serving model, kept warm for instant rollback
+model_generation = 0  # Bumped on every successful load
+registry = ModelRegistry(MODELS_DIR)
+swap_lock = threading.Lock()
+reload_lock = threading.Lock()
+reload_state = {'state': 'idle'}
+watcher_pid = None
+
+# Liveness vs readiness: the process is live once it answers; it is ready once data
+# and a warmed-up model are loaded (reloads keep serving the old model, so stay ready)
+ready = False
+startup = {'started': datetime.now().isoformat(), 'ready_at': None, 'timings_ms': {}}
+current_snapshot = None  # PreparedResponse for /api/parking/current
+
+# Dashboard updates pushed over /api/parking/stream
+broadcaster = Broadcaster()
+stream_changed = threading.Event()
+publisher_pid = None
+
+prediction_cache = LRUCache(PREDICTION_CACHE_SIZE, CACHE_TTL)
+response_cache = LRUCache(RESPONSE_CACHE_SIZE, CACHE_TTL)
+
+def model_artifacts(version=None):
+    """(version, artifact paths) of a registry version, the published one by default
+
+    Without a registry (models trained before versioning) the flat files in models/ are used.
+    """
+    version = version or registry.current()
+    if version is None:
+        return None, artifact_paths(MODELS_DIR)
+    return version, registry.artifacts(version)
+
+def load_inference_model(paths):
+    """Load the model with the configured backend, returning (model, backend name)
+
+    A reduced MODEL_PRECISION serves the quantized weights; versions trained before
+    they were exported fall back to float32.
+    """
+    weights_path = paths['weights']
+    if MODEL_PRECISION != 'float32':
+        quantized_path = paths[f'weights_{MODEL_PRECISION}']
+        if INFERENCE_BACKEND == 'keras':
+            print(f"⚠️  {MODEL_PRECISION} weights need the numpy backend; serving the float32 keras model")
+        elif os.path.exists(quantized_path):
+            weights_path = quantized_path
+        else:
+            print(f"⚠️  No {MODEL_PRECISION} weights in this version (run quantization.py); serving float32")
+    
+    if INFERENCE_BACKEND in ('auto', 'numpy') and os.path.exists(weights_path):
+        return NumpyLSTM.load(weights_path), 'numpy'
+    
+    if INFERENCE_BACKEND in ('auto', 'keras') and os.path.exists(paths['model']):
+        try:
+            from tensorflow import keras
+        except ImportError:
+            print("⚠️  TensorFlow not installed. Install with: pip install tensorflow")
+            return None, None
+        return keras.models.load_model(paths['model'], compile=False), 'keras'
+    
+    return None, None
+
+def load_predictor(version=None, timer=None):
+    """Load a model version and its preprocessing artifacts into a BatchPredictor (None if missing)"""
+    timer = timer or StageTimer()
+    version, paths = model_artifacts(version)
+    
+    # Load model
+    with timer.stage('model_load'):
+        loaded_model, backend = load_inference_model(paths)
+    if loaded_model is not None:
+        print(f"✅ Model loaded ({backend} backend, {getattr(loaded_model, 'precision', 'float32')} weights, "
+              f"version {version or 'unversioned'})")
+    else:
+        print("⚠️  Model not found. Run train_model.py first.")
+        return None
+    
+    # Load preprocessing artifacts
+    artifacts = {}
+    for name, label in (('scaler', 'Scaler'), ('encoder', 'Encoder'), ('info', 'Model info')):
+        artifacts[name] = None
+        if os.path.exists(paths[name]):
+            with timer.stage(f'{name}_pickle'), open(paths[name], 'rb') as f:
+                artifacts[name] = pickle.load(f)
+            print(f"✅ {label} loaded")
+    
+    loaded = BatchPredictor(loaded_model, artifacts['scaler'], artifacts['encoder'], artifacts['info'],
+                            backend=backend, version=version)
+    
+    # Pre-scaled history (a hit when training ran on the same data, otherwise scaled once and stored)
+    if FEATURE_STORE_ENABLED and store is not None:
+        try:
+            with timer.stage('feature_store'):
+                stats = loaded.load_features(store, FeatureStore(FEATURES_DIR))
+            print(f"✅ Feature store {stats['status']}: {stats['rows_reused']:,} rows reused, "
+                  f"{stats['rows_computed']:,} scaled")
+        except Exception as e:
+            print(f"⚠️  Feature store unavailable, scaling per request: {e}")
+    
+    return loaded
+
+def warm_up(candidate):
+    """Run every batch shape the server uses through a freshly loaded model and check its output
+
+    The first call at each shape pays one-off costs (graph tracing for keras, buffer
+    allocation), which would otherwise land on the first real requests.
+    """
+    for size in sorted({min(n, len(store.lot_ids)) for n in WARMUP_BATCH_SIZES}):
+        lot_ids = store.lot_ids[:size]
+        forecasts = candidate.predict(store, lot_ids)
+        
+        values = np.array([f['forecast'] for f in forecasts.values()])
+        if size and (len(values) == 0 or not np.isfinite(values).all()):
+            raise ValueError(f"Model produced no or non-finite predictions during warmup (batch of {size})")
+
+def activate(new_predictor):
+    """Atomically make `new_predictor` the serving model, keeping the old one for rollback"""
+    global predictor, previous_predictor, model, model_backend, scaler, zone_encoder, model_info, model_generation
+    
+    with swap_lock:
+        model_generation += 1
+        new_predictor.generation = model_generation
+        
+        # Requests read the `predictor` global once, so this single assignment is the swap
+        previous_predictor, predictor = predictor, new_predictor
+        model, model_backend = new_predictor.model, new_predictor.backend
+        scaler, zone_encoder, model_info = new_predictor.scaler, new_predictor.zone_encoder, new_predictor.model_info
+    
+    # Cache keys include the generation, so old entries are unreachable; free them too
+    prediction_cache.clear()
+    response_cache.clear()
+    refresh_current_snapshot()
 
 def load_models():
     """Load trained model and preprocessing artifacts"""
-    global model, scaler, zone_encoder, model_info, df_data
+    global store, ready
     
     print("🔄 Loading models...")
+    timer = StageTimer()
     
     try:
-        # Load data
-        if os.path.exists(DATA_PATH):
-            df_data = pd.read_csv(DATA_PATH)
-            df_data['timestamp'] = pd.to_datetime(df_data['timestamp'])
-            print(f"✅ Data loaded: {len(df_data):,} records")
+        # Load data (memory-mapped columnar format if converted, CSV otherwise)
+        if os.path.exists(COLUMNAR_PATH):
+            with timer.stage('columnar_open'):
+                data = read_columnar(COLUMNAR_PATH)
+            with timer.stage('store_build'):
+                store = LotStore.from_columnar(data, live_capacity=LIVE_BUFFER_SIZE)
+            print(f"✅ Data loaded: {store.n_records:,} records (columnar, {len(store.lot_ids)} lots)")
+        elif os.path.exists(DATA_PATH):
+            with timer.stage('csv_parse'):
+                df_data = pd.read_csv(DATA_PATH)
+            with timer.stage('to_datetime'):
+                df_data['timestamp'] = pd.to_datetime(df_data['timestamp'])
+            with timer.stage('store_build'):
+                store = LotStore.from_frame(df_data, live_capacity=LIVE_BUFFER_SIZE)
+            print(f"✅ Data loaded: {store.n_records:,} records ({len(store.lot_ids)} lots)")
         else:
             print("⚠️  Data not found. Run generate_data.py first.")
             return False
         
-        # Load model
-        if TENSORFLOW_AVAILABLE and os.path.exists(MODEL_PATH):
-            model = keras.models.load_model(MODEL_PATH)
-            print("✅ Model loaded")
-        else:
-            print("⚠️  Model not found. Run train_model.py first.")
+        loaded = load_predictor(timer=timer)
+        if loaded is None:
             return False
         
-        # Load preprocessing artifacts
-        if os.path.exists(SCALER_PATH):
-            with open(SCALER_PATH, 'rb') as f:
-                scaler = pickle.load(f)
-            print("✅ Scaler loaded")
-        
-        if os.path.exists(ENCODER_PATH):
-            with open(ENCODER_PATH, 'rb') as f:
-                zone_encoder = pickle.load(f)
-            print("✅ Encoder loaded")
+        with timer.stage('warmup'):
+            warm_up(loaded)
+        with timer.stage('activate'):
+            activate(loaded)
         
-        if os.path.exists(INFO_PATH):
-            with open(INFO_PATH, 'rb') as f:
-                model_info = pickle.load(f)
-            print("✅ Model info loaded")
+        ready = True
+        startup.update(ready_at=datetime.now().isoformat(), timings_ms=timer.as_dict())
+        timer.report("Startup timings")
         
         print("🎉 All models loaded successfully!\n")
         return True
         
     except Exception as e:
+        startup.update(error=str(e), timings_ms=timer.as_dict())
         print(f"❌ Error loading models: {e}")
         return False
 
+def reload_model(version=None, publish=False):
+    """Load, warm up and swap in a model version while the current one keeps serving
+
+    Runs on a background thread (admin endpoint or registry watcher); progress is in `reload_state`.
+    """
+    global reload_state
+    
+    started = datetime.now()
+    reload_state = {'state': 'loading', 'version': version, 'started': started.isoformat()}
+    timer = StageTimer()
+    
+    try:
+        loaded = load_predictor(version, timer)
+        if loaded is None:
+            raise FileNotFoundError(f"Model artifacts not found for version {version}")
+        
+        with timer.stage('warmup'):
+            warm_up(loaded)
+        with timer.stage('activate'):
+            activate(loaded)
+        if publish and loaded.version is not None:
+            registry.publish(loaded.version)
+        
+        reload_state = {'state': 'ready', 'version': loaded.version, 'started': started.isoformat(),
+                        'seconds': (datetime.now() - started).total_seconds(), 'timings_ms': timer.as_dict()}
+        print(f"🔁 Model version {loaded.version} is now serving")
+        
+    except Exception as e:
+        reload_state = {'state': 'failed', 'version': version, 'started': started.isoformat(), 'error': str(e)}
+        print(f"❌ Model reload failed, still serving {predictor.version if predictor else None}: {e}")
+
+def start_reload(version=None, publish=False):
+    """Start reload_model on a background thread unless one is already running"""
+    with reload_lock:
+        if reload_state.get('state') == 'loading':
+            return None
+        reload_state.update(state='loading', version=version)
+        thread = threading.Thread(target=reload_model, args=(version, publish), name='model-reload', daemon=True)
+        thread.start()
+        return thread
+
+def watch_registry():
+    """Reload whenever the published version changes (every worker process runs its own watcher)"""
+    failed = None
+    while True:
+        time.sleep(MODEL_WATCH_SECONDS)
+        published = registry.current()
+        
+        if published and predictor is not None and published not in (predictor.version, failed):
+            thread = start_reload(published)
+            if thread is not None:
+                thread.join()
+                failed = published if reload_state.get('state') == 'failed' else None
+
+def start_registry_watcher():
+    """Start the watcher once per process (threads do not survive a pre-fork server's fork)"""
+    global watcher_pid
+    
+    if MODEL_WATCH_SECONDS <= 0 or watcher_pid == os.getpid():
+        return
+    watcher_pid = os.getpid()
+    threading.Thread(target=watch_registry, name='registry-watcher', daemon=True).start()
+
+def cache_version(p=None):
+    """Version of the data and model that cached entries were computed from"""
+    p = p or predictor
+    return (store.version if store is not None else None, p.generation if p is not None else 0)
+
 def get_current_data():
     """Get most recent data for all parking lots"""
-    if df_data is None:
+    if store is None:
         return None
     
-    # Get latest timestamp
-    latest_time = df_data['timestamp'].max()
-    current_data = df_data[df_data['timestamp'] == latest_time].copy()
+    return store.snapshot
+
+def forecast_hours():
+    """Horizons (hours ahead) the loaded model forecasts"""
+    return predictor.forecast_hours if predictor is not None else []
+
+def parse_horizons(value, default=(1,)):
+    """Parse a comma-separated list of hours, returning (horizons, error message)"""
+    if not value:
+        return list(default), None
+    
+    try:
+        horizons = [int(h) for h in value.split(',')]
+    except ValueError:
+        return None, f"Invalid horizons: {value}"
+    
+    unsupported = [h for h in horizons if h not in forecast_hours()]
+    if unsupported:
+        return None, f"Unsupported horizons {unsupported}; the model forecasts {forecast_hours()} hours ahead"
     
-    return current_data
+    return horizons, None
 
 def predict_occupancy(lot_id, hours_ahead=1):
     """Predict parking occupancy for a specific lot"""
-    if model is None or df_data is None:
+    predictions = predict_occupancy_batch([lot_id], hours_ahead)
+    
+    if predictions is None:
+        return None
+    
+    return predictions.get(lot_id)
+
+def predict_occupancy_batch(lot_ids, hours_ahead=1):
+    """Predict parking occupancy `hours_ahead` for many lots in a single forward pass"""
+    forecasts = forecast_batch(lot_ids)
+    
+    if forecasts is None or hours_ahead not in forecast_hours():
+        return None
+    
+    index = forecast_hours().index(hours_ahead)
+    return {
+        lot_id: dict(forecast, predicted_occupancy=forecast['forecast'][index])
+        for lot_id, forecast in forecasts.items()
+    }
+
+def forecast_batch(lot_ids):
+    """Forecast curves (every horizon) for many lots in a single forward pass"""
+    if predictor is None or store is None:
         return None
     
     try:
-        # Get historical data for this lot
-        lot_data = df_data[df_data['lot_id'] == lot_id].copy()
+        version = cache_version()
+        results, missing = {}, []
         
-        if len(lot_data) < model_info['sequence_length']:
-            return None
-        
-        # Get last sequence
-        feature_cols = model_info['feature_cols']
-        
-        # Get recent data
-        recent = lot_data.tail(model_info['sequence_length']).copy()
-        
-        # Prepare zone encoding for recent data if not present
-        if 'zone_encoded' not in recent.columns:
-            zone = recent.iloc[-1]['zone_type']
-            zone_encoded = zone_encoder.transform([zone])[0]
-            recent['zone_encoded'] = zone_encoded
-        
-        # Create feature array
-        sequence = recent[feature_cols].values
+        with request_stages().stage('cache_lookup'):
+            for lot_id in dict.fromkeys(lot_ids):
+                cached = prediction_cache.get((lot_id, version))
+                if cached is None:
+                    missing.append(lot_id)
+                else:
+                    results[lot_id] = cached
         
-        # Scale features
-        sequence_scaled = scaler.transform(sequence.reshape(-1, sequence.shape[-1])).reshape(1, sequence.shape[0], sequence.shape[1])
+        # Lots that were not cached go to the scheduler, batched with concurrent requests
+        if missing:
+            with request_stages().stage('scheduler_wait'):
+                computed = scheduler.submit_many(missing).result(timeout=INFERENCE_TIMEOUT)
+            results.update((lot_id, forecast) for lot_id, forecast in computed.items() if forecast is not None)
         
-        # Predict
-        prediction = model.predict(sequence_scaled, verbose=0)[0][0]
-        
-        # Calculate confidence based on recent variability
-        recent_std = recent['occupancy_rate'].std()
-        confidence = max(0, 100 - (recent_std * 200))  # Higher std = lower confidence
-        
-        return {
-            'predicted_occupancy': float(prediction),
-            'confidence': float(confidence),
-            'current_occupancy': float(recent.iloc[-1]['occupancy_rate'])
-        }
+        return results
         
     except Exception as e:
-        print(f"Error predicting for {lot_id}: {e}")
+        print(f"Error predicting for {len(lot_ids)} lots: {e}")
         return None
 
+def run_forecast(lot_ids):
+    """One forward pass for a micro-batch of lots (runs on the scheduler thread)"""
+    serving = predictor  # Same model for the whole batch even if a reload swaps it meanwhile
+    version = cache_version(serving)
+    timer = StageTimer()
+    forecasts = serving.predict(store, lot_ids, timer)
+    metrics.observe_stages('parking_inference_stage_seconds', timer)
+    
+    for lot_id, forecast in forecasts.items():
+        prediction_cache.set((lot_id, version), forecast)
+    
+    return forecasts
+
+def request_stages():
+    """StageTimer of the current request; its stages are recorded in /metrics when the request ends"""
+    if not has_request_context():
+        return StageTimer()
+    if 'stage_timer' not in g:
+        g.stage_timer = StageTimer()
+    return g.stage_timer
+
+def serialize(payload):
+    """jsonify, timed as the request's serialization stage"""
+    with request_stages().stage('serialization'):
+        return jsonify(payload)
+
+scheduler = MicroBatcher(run_forecast, MICROBATCH_MAX_SIZE, MICROBATCH_WAIT_MS / 1000)
+
+metrics.histogram('parking_inference_stage_seconds',
+                  'Time per stage of each batched forward pass (data_lookup, feature_assembly, scaling, inference)')
+metrics.histogram('parking_request_stage_seconds',
+                  'Time per stage of a request (cache_lookup, scheduler_wait, serialization)')
+metrics.callback('parking_ready', 'gauge', 'Whether data and a warmed-up model are loaded',
+                 lambda: {None: int(ready)})
+metrics.callback('parking_model_generation', 'gauge', 'Number of model activations in this process',
+                 lambda: {None: model_generation})
+metrics.callback('parking_store_records', 'gauge', 'Rows held by the data store',
+                 lambda: {None: store.n_records if store is not None else 0})
+metrics.callback('parking_ingested_observations_total', 'counter', 'Observations ingested since startup',
+                 lambda: {None: store.n_ingested if store is not None else 0})
+
+def cache_lookups():
+    samples = {}
+    for name, cache in (('predictions', prediction_cache), ('responses', response_cache)):
+        samples[(('cache', name), ('result', 'hit'))] = cache.hits
+        samples[(('cache', name), ('result', 'miss'))] = cache.misses
+    return samples
+
+metrics.callback('parking_cache_lookups_total', 'counter', 'Cache lookups by cache and result', cache_lookups)
+
+metrics.callback('parking_stream_subscribers', 'gauge', 'Connected server-sent event clients',
+                 lambda: {None: len(broadcaster)})
+metrics.callback('parking_scheduler_queue_depth', 'gauge', 'Requests waiting for the inference scheduler',
+                 lambda: {None: scheduler.stats()['queue_depth']})
+metrics.callback('parking_scheduler_batches_total', 'counter', 'Forward passes run by the inference scheduler',
+                 lambda: {None: scheduler.batches})
+metrics.callback('parking_scheduler_batch_keys_total', 'counter', 'Lots predicted by the inference scheduler',
+                 lambda: {None: scheduler.keys})
+
 @app.route('/')
 def index():
     """Serve the web dashboard"""
     return send_from_directory('../web', 'index.html')
 
+@app.route('/api/live')
+def liveness():
+    """Liveness probe: the process is up and answering"""
+    return jsonify({'live': True})
+
+@app.route('/api/ready')
+def readiness():
+    """Readiness probe: 503 until data and a warmed-up model are loaded"""
+    return jsonify({'ready': ready}), 200 if ready else 503
+
 @app.route('/api/status')
 def status():
     """API health check"""
     return jsonify({
         'status': 'online',
+        'live': True,
+        'ready': ready,
+        'startup': startup,
         'model_loaded': model is not None,
-        'data_loaded': df_data is not None,
+        'inference_backend': model_backend,
+        'inference_precision': getattr(model, 'precision', 'float32') if model is not None else None,
+        'inference_weights_bytes': getattr(model, 'nbytes', None),
+        'model_version': predictor.version if predictor is not None else None,
+        'features': predictor.features.stats if predictor is not None and predictor.features is not None else None,
+        'forecast_hours': forecast_hours(),
+        'cache': {
+            'predictions': prediction_cache.stats(),
+            'responses': response_cache.stats()
+        },
+        'scheduler': scheduler.stats(),
+        'stream': broadcaster.stats(),
+        'data_loaded': store is not None,
+        'worker_pid': os.getpid(),
         'timestamp': datetime.now().isoformat()
     })
 
-@app.route('/api/parking/current')
-def get_current_parking():
-    """Get current parking availability for all lots"""
-    current = get_current_data()
+PROXY_HEADERS = ('X-Forwarded-For', 'X-Real-IP', 'Forwarded')
+
+def admin_allowed():
+    """Admin requests need the admin token, or must come directly from this machine when none is configured"""
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+    if any(header in request.headers for header in PROXY_HEADERS):
+        return False
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.after_request
+def record_request_stages(response):
+    """Observe the request's stage timings, labelled by route"""
+    timer = g.pop('stage_timer', None)
+    if timer is not None and request.url_rule is not None:
+        metrics.observe_stages('parking_request_stage_seconds', timer, {'route': request.url_rule.rule})
+    return response
+
+@app.before_request
+def start_profiler():
+    """?profile=1 (or X-Profile: 1) samples this request and returns folded stacks instead of the response"""
+    wants_profile = request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+    if wants_profile and PROFILING_ENABLED and admin_allowed():
+        threads = [threading.get_ident(), scheduler.thread_ident]
+        g.profiler = SamplingProfiler([t for t in threads if t is not None], PROFILE_INTERVAL_MS / 1000).start()
+
+@app.after_request
+def finish_profiler(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
     
-    if current is None:
-        return jsonify({'error': 'No data available'}), 404
+    profiler.stop()
+    return Response(profiler.folded(), mimetype='text/plain', headers={
+        'X-Profile-Samples': str(profiler.samples),
+        'X-Profiled-Status': str(response.status_code)
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+def profiling_toggle():
+    """Show or set ({"enabled": true}) whether ?profile=1 requests are profiled"""
+    global PROFILING_ENABLED
     
+    if not admin_allowed():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if request.method == 'POST':
+        PROFILING_ENABLED = bool((request.get_json(silent=True) or {}).get('enabled'))
+    
+    return jsonify({'enabled': PROFILING_ENABLED, 'interval_ms': PROFILE_INTERVAL_MS})
+
+@app.before_request
+def ensure_background_threads():
+    """Start per-process background threads lazily (cheap pid check after the first request)"""
+    start_registry_watcher()
+    start_stream_publisher()
+
+@app.before_request
+def require_ready():
+    """Data endpoints answer 503 while the server is still loading"""
+    if not ready and request.path.startswith(('/api/parking/', '/api/analytics/')):
+        return jsonify({'error': 'Server is starting up'}), 503, {'Retry-After': '5'}
+
+@app.route('/api/admin/models')
+def list_models():
+    """Registry versions, the serving and rollback versions, and the last reload"""
+    if not admin_allowed():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    return jsonify({
+        'serving': predictor.version if predictor is not None else None,
+        'rollback': previous_predictor.version if previous_predictor is not None else None,
+        'published': registry.current(),
+        'versions': registry.versions(),
+        'reload': reload_state
+    })
+
+@app.route('/api/admin/models/reload', methods=['POST'])
+def reload_models():
+    """Load a model version in the background and swap it in once warm
+
+    Body (optional): {"version": "<version>"}; defaults to the published version.
+    Reloading a specific version also publishes it, so other workers' watchers follow.
+    Add ?wait=1 to block until the swap is done.
+    """
+    if not admin_allowed():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    version = (request.get_json(silent=True) or {}).get('version')
+    if version is not None and version not in registry.versions():
+        return jsonify({'error': f'Unknown model version: {version}'}), 404
+    
+    thread = start_reload(version, publish=version is not None)
+    if thread is None:
+        return jsonify({'error': 'A reload is already in progress', 'reload': reload_state}), 409
+    
+    if request.args.get('wait', type=int):
+        thread.join()
+        return jsonify({'reload': reload_state}), 200 if reload_state['state'] == 'ready' else 500
+    
+    return jsonify({'reload': reload_state}), 202
+
+@app.route('/api/admin/models/rollback', methods=['POST'])
+def rollback_model():
+    """Swap back to the previously serving model (kept warm in memory) and publish it"""
+    if not admin_allowed():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    target = previous_predictor
+    if target is None:
+        # Nothing in memory (e.g. after a restart): reload the version committed before the serving one
+        version = registry.previous(predictor.version) if predictor is not None and predictor.version else None
+        if version is None:
+            return jsonify({'error': 'No previous model version'}), 404
+        
+        thread = start_reload(version, publish=True)
+        if thread is None:
+            return jsonify({'error': 'A reload is already in progress', 'reload': reload_state}), 409
+        thread.join()
+        return jsonify({'serving': predictor.version, 'reload': reload_state}), \
+            200 if reload_state['state'] == 'ready' else 500
+    
+    activate(target)
+    if target.version is not None:
+        registry.publish(target.version)
+    print(f"⏪ Rolled back to model version {target.version}")
+    
+    return jsonify({
+        'serving': predictor.version,
+        'rollback': previous_predictor.version if previous_predictor is not None else None
+    })
+
+def build_current_payload(current):
+    """Current availability payload for all lots"""
     lots = []
-    for _, row in current.iterrows():
+    for row in current.to_dict('records'):
         lots.append({
             'lot_id': row['lot_id'],
             'lot_name': row['lot_name'],
@@ -182,13 +699,186 @@ def get_current_parking():
             'timestamp': row['timestamp'].isoformat()
         })
     
-    return jsonify({
-        'timestamp': current.iloc[0]['timestamp'].isoformat(),
+    return {
+        'timestamp': current['timestamp'].max().isoformat(),
         'parking_lots': lots,
         'total_capacity': int(current['capacity'].sum()),
         'total_occupied': int(current['occupied_slots'].sum()),
         'total_available': int(current['available_slots'].sum()),
         'average_occupancy': float(current['occupancy_rate'].mean())
+    }
+
+def refresh_current_snapshot():
+    """Serialize and precompress the current snapshot (called whenever data changes)"""
+    global current_snapshot
+    
+    current = get_current_data()
+    if current is None or len(current) == 0:
+        current_snapshot = None
+        return None
+    
+    # Last-Modified is the newest reading (stored as naive local time), so model swaps and
+    # refreshes in other workers leave it unchanged
+    last_modified = pd.Timestamp(store.latest_time).to_pydatetime().astimezone(timezone.utc)
+    current_snapshot = PreparedResponse(build_current_payload(current), version=cache_version(),
+                                        last_modified=last_modified)
+    stream_changed.set()
+    return current_snapshot
+
+@app.route('/api/parking/current')
+def get_current_parking():
+    """Get current parking availability for all lots"""
+    snapshot = current_snapshot
+    
+    if snapshot is None or snapshot.version != cache_version():
+        snapshot = refresh_current_snapshot()
+    
+    if snapshot is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    return snapshot.to_response(request)
+
+def stream_state():
+    """Dashboard state: fleet totals plus each lot's current and predicted availability"""
+    current = get_current_data()
+    predictions = predict_occupancy_batch(current['lot_id'].tolist()) or {}
+    
+    lots = {}
+    for row in current.to_dict('records'):
+        lot = {
+            'lot_id': row['lot_id'],
+            'lot_name': row['lot_name'],
+            'zone_type': row['zone_type'],
+            'capacity': int(row['capacity']),
+            'occupied_slots': int(row['occupied_slots']),
+            'available_slots': int(row['available_slots']),
+            'occupancy_rate': float(row['occupancy_rate']),
+            'timestamp': row['timestamp'].isoformat()
+        }
+        pred = predictions.get(row['lot_id'])
+        if pred is not None:
+            lot.update(
+                predicted_occupancy=float(pred['predicted_occupancy']),
+                predicted_available=lot['capacity'] - int(pred['predicted_occupancy'] * lot['capacity']),
+                confidence=float(pred['confidence']),
+                trend='up' if pred['predicted_occupancy'] > pred['current_occupancy'] else 'down'
+            )
+        lots[row['lot_id']] = lot
+    
+    stats = {
+        'timestamp': current['timestamp'].max().isoformat(),
+        'total_capacity': int(current['capacity'].sum()),
+        'total_occupied': int(current['occupied_slots'].sum()),
+        'total_available': int(current['available_slots'].sum()),
+        'average_occupancy': float(current['occupancy_rate'].mean())
+    }
+    return stats, lots
+
+def state_changes(old, new):
+    """Fields of `new` that differ from `old` (a flat dict)"""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+def publish_updates():
+    """Background loop: compute the dashboard state once per data or model change and broadcast the differences"""
+    last_version, last_stats, last_lots = None, None, None
+    
+    while True:
+        stream_changed.wait(STREAM_POLL_SECONDS)
+        stream_changed.clear()
+        
+        # Only worth computing while someone listens; new subscribers get the last snapshot
+        version = cache_version()
+        if not ready or version == last_version or (not len(broadcaster) and last_version is not None):
+            continue
+        
+        try:
+            stats, lots = stream_state()
+        except Exception as e:
+            print(f"⚠️  Stream update failed: {e}")
+            continue
+        
+        snapshot = {'stats': stats, 'lots': list(lots.values())}
+        if last_lots is None:
+            broadcaster.publish('snapshot', snapshot, snapshot=snapshot)
+        else:
+            changed = []
+            for lot_id, lot in lots.items():
+                fields = state_changes(last_lots.get(lot_id, {}), lot)
+                if fields:
+                    changed.append({'lot_id': lot_id, **fields})
+            broadcaster.publish('update', {'stats': state_changes(last_stats, stats), 'lots': changed},
+                                snapshot=snapshot)
+        last_version, last_stats, last_lots = version, stats, lots
+
+def start_stream_publisher():
+    """Start the stream publisher once per process"""
+    global publisher_pid
+    
+    if publisher_pid == os.getpid():
+        return
+    publisher_pid = os.getpid()
+    threading.Thread(target=publish_updates, name='stream-publisher', daemon=True).start()
+
+@app.route('/api/parking/stream')
+def stream_parking():
+    """Server-sent events: a `snapshot` of every lot, then `update` events with only the changed fields
+
+    Each update is computed once per data change and shared by all subscribers. Connections
+    close after PARKING_STREAM_MAX_SECONDS; EventSource reconnects and resyncs from a snapshot.
+    """
+    if len(broadcaster) >= MAX_STREAM_CLIENTS:
+        return jsonify({'error': 'Too many stream clients; poll /api/parking/current instead'}), 503
+    
+    start_stream_publisher()
+    stream_changed.set()  # Catch up now if nothing has been published since the last change
+    subscriber = broadcaster.subscribe()
+    
+    def events():
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    yield subscriber.get(timeout=min(STREAM_KEEPALIVE_SECONDS, max(deadline - time.monotonic(), 0.01)))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+    })
+
+@app.route('/api/parking/observations', methods=['POST'])
+def ingest():
+    """Ingest live sensor readings for any number of lots
+
+    Body: {"observations": [{"lot_id", "timestamp", "occupied_slots" or "occupancy_rate"}, ...]}
+    Invalid readings are reported inline; the others are still applied.
+    """
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    body = request.get_json(silent=True)
+    observations = body.get('observations') if isinstance(body, dict) else body
+    
+    if not isinstance(observations, list):
+        return jsonify({'error': 'Expected a list of observations'}), 400
+    if len(observations) > MAX_OBSERVATIONS:
+        return jsonify({'error': f'At most {MAX_OBSERVATIONS} observations per request'}), 413
+    
+    accepted, errors = ingest_observations(store, observations)
+    
+    if accepted:
+        refresh_current_snapshot()
+    
+    return jsonify({
+        'accepted': accepted,
+        'rejected': len(errors),
+        'errors': errors,
+        'latest_timestamp': pd.Timestamp(store.latest_time).isoformat(),
+        'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/api/parking/predict/<lot_id>')
@@ -199,19 +889,29 @@ def predict_parking(lot_id):
     if model is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
+    if hours_ahead not in forecast_hours():
+        return jsonify({'error': f"Unsupported horizon; the model forecasts {forecast_hours()} hours ahead"}), 400
+    
     prediction = predict_occupancy(lot_id, hours_ahead)
     
     if prediction is None:
         return jsonify({'error': 'Prediction failed'}), 500
     
     # Get current data for this lot
-    current = get_current_data()
-    lot_current = current[current['lot_id'] == lot_id].iloc[0]
+    lot_current = store.latest(lot_id)
+    
+    if lot_current is None:
+        return jsonify({'error': 'No current data for lot'}), 404
     
+    return serialize(dict(prediction_payload(lot_id, lot_current, prediction, hours_ahead),
+                          timestamp=datetime.now().isoformat()))
+
+def prediction_payload(lot_id, lot_current, prediction, hours_ahead):
+    """Response body for one lot's prediction (shared by the single and batch endpoints)"""
     predicted_occupied = int(prediction['predicted_occupancy'] * lot_current['capacity'])
     predicted_available = lot_current['capacity'] - predicted_occupied
     
-    return jsonify({
+    return {
         'lot_id': lot_id,
         'lot_name': lot_current['lot_name'],
         'hours_ahead': hours_ahead,
@@ -231,23 +931,120 @@ def predict_parking(lot_id):
             'occupancy_delta': prediction['predicted_occupancy'] - prediction['current_occupancy'],
             'trend': 'increasing' if prediction['predicted_occupancy'] > prediction['current_occupancy'] else 'decreasing'
         },
+        'forecast': [
+            {
+                'hours_ahead': hours,
+                'occupancy_rate': occupancy_rate,
+                'available_slots': lot_current['capacity'] - int(occupancy_rate * lot_current['capacity'])
+            }
+            for hours, occupancy_rate in zip(forecast_hours(), prediction['forecast'])
+        ]
+    }
+
+def batch_request():
+    """Parameters of a batch request: a JSON body, or the query string for GET
+
+    Returns (lot_ids, params, error message); `lot_ids` is a list in the body or comma-separated in the query.
+    """
+    if request.method == 'POST':
+        params = request.get_json(silent=True)
+        if not isinstance(params, dict):
+            return None, None, 'Expected a JSON object body'
+        lot_ids = params.get('lot_ids')
+    else:
+        params = request.args.to_dict()
+        lot_ids = [lot_id for lot_id in params.get('lot_ids', '').split(',') if lot_id]
+    
+    if not isinstance(lot_ids, list) or not lot_ids or not all(isinstance(lot_id, str) for lot_id in lot_ids):
+        return None, None, 'lot_ids must be a non-empty list of lot IDs'
+    if len(lot_ids) > MAX_BATCH_LOTS:
+        return None, None, f'At most {MAX_BATCH_LOTS} lots per request'
+    
+    return list(dict.fromkeys(lot_ids)), params, None
+
+@app.route('/api/parking/predict/batch', methods=['GET', 'POST'])
+def predict_parking_batch():
+    """Predictions for a list of lots from one batched model call
+
+    Body `{"lot_ids": [...], "hours": 2}` (or `?lot_ids=A,B&hours=2`). Lots that cannot be
+    predicted are reported inline with an `error` instead of failing the request.
+    """
+    lot_ids, params, error = batch_request()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        hours_ahead = int(params.get('hours', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'hours must be an integer'}), 400
+    
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    if hours_ahead not in forecast_hours():
+        return jsonify({'error': f"Unsupported horizon; the model forecasts {forecast_hours()} hours ahead"}), 400
+    
+    known = [lot_id for lot_id in lot_ids if lot_id in store]
+    predictions = predict_occupancy_batch(known, hours_ahead) if known else {}
+    
+    if predictions is None:
+        return jsonify({'error': 'Prediction failed'}), 500
+    
+    results = []
+    for lot_id in lot_ids:
+        lot_current = store.latest(lot_id)
+        if lot_current is None:
+            results.append({'lot_id': lot_id, 'error': 'Unknown lot'})
+        elif lot_id not in predictions:
+            results.append({'lot_id': lot_id, 'error': 'Not enough history to predict'})
+        else:
+            results.append(prediction_payload(lot_id, lot_current, predictions[lot_id], hours_ahead))
+    
+    return serialize({
+        'hours_ahead': hours_ahead,
+        'results': results,
+        'errors': sum('error' in result for result in results),
         'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/api/parking/predict/all')
 def predict_all():
-    """Get predictions for all parking lots"""
+    """Get predictions for all parking lots
+
+    `?horizons=1,2,3` adds each lot's forecast at those horizons (the lot x horizon
+    matrix, from the same single forward pass); the headline prediction is the first horizon.
+    """
     current = get_current_data()
     
     if current is None:
         return jsonify({'error': 'No data available'}), 404
     
+    horizons_param = request.args.get('horizons')
+    horizons, error = parse_horizons(horizons_param)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    response = {'timestamp': datetime.now().isoformat()}
+    if horizons_param:
+        response['horizons'] = horizons
+    
+    cache_key = ('predict_all', tuple(horizons) if horizons_param else None, cache_version())
+    predictions = response_cache.get(cache_key)
+    if predictions is not None:
+        response['predictions'] = predictions
+        return serialize(response)
+    
+    batch = forecast_batch(current['lot_id'].tolist())
+    columns = [forecast_hours().index(h) for h in horizons]
+    
     predictions = []
     
-    for _, row in current.iterrows():
-        pred = predict_occupancy(row['lot_id'])
+    for row in current.to_dict('records'):
+        pred = (batch or {}).get(row['lot_id'])
         
         if pred:
+            curve = [pred['forecast'][i] for i in columns]
+            pred = dict(pred, predicted_occupancy=curve[0])
             predicted_occupied = int(pred['predicted_occupancy'] * row['capacity'])
             predicted_available = row['capacity'] - predicted_occupied
             
@@ -263,78 +1060,343 @@ def predict_all():
                 'confidence': float(pred['confidence']),
                 'trend': 'up' if pred['predicted_occupancy'] > pred['current_occupancy'] else 'down'
             })
+            
+            if horizons_param:
+                predictions[-1]['forecast'] = curve
+                predictions[-1]['forecast_available'] = [row['capacity'] - int(rate * row['capacity']) for rate in curve]
     
-    return jsonify({
-        'timestamp': datetime.now().isoformat(),
-        'predictions': predictions
+    if batch is not None:
+        response_cache.set(cache_key, predictions)
+    
+    response['predictions'] = predictions
+    return serialize(response)
+
+@app.route('/api/parking/nearby')
+def nearby_parking():
+    """Lots nearest to a point, with current availability and batched predictions
+
+    `?lat=40.713&lon=-74.006` is required; `radius` (km) limits the distance, `limit`
+    (default 10) the number of lots, and `hours` picks the prediction horizon.
+    """
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius = request.args.get('radius', type=float)
+    limit = request.args.get('limit', default=10, type=int)
+    hours_ahead = request.args.get('hours', default=1, type=int)
+    
+    if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        return jsonify({'error': 'lat and lon must be valid coordinates'}), 400
+    if radius is not None and radius <= 0:
+        return jsonify({'error': 'radius must be positive (km)'}), 400
+    if limit is None or not 1 <= limit <= MAX_BATCH_LOTS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_BATCH_LOTS}'}), 400
+    if predictor is not None and hours_ahead not in forecast_hours():
+        return jsonify({'error': f"Unsupported horizon; the model forecasts {forecast_hours()} hours ahead"}), 400
+    
+    nearest = store.spatial.nearest(lat, lon, limit, radius)
+    predictions = predict_occupancy_batch([lot_id for lot_id, _ in nearest], hours_ahead) if nearest else {}
+    
+    lots = []
+    for lot_id, distance in nearest:
+        row = store.latest(lot_id)
+        pred = (predictions or {}).get(lot_id)
+        lots.append({
+            'lot_id': lot_id,
+            'lot_name': row['lot_name'],
+            'zone_type': row['zone_type'],
+            'latitude': float(row['latitude']),
+            'longitude': float(row['longitude']),
+            'distance_km': round(distance, 3),
+            'capacity': int(row['capacity']),
+            'occupancy_rate': float(row['occupancy_rate']),
+            'available_slots': int(row['available_slots']),
+            'prediction': None if pred is None else {
+                'occupancy_rate': float(pred['predicted_occupancy']),
+                'available_slots': int(row['capacity']) - int(pred['predicted_occupancy'] * row['capacity']),
+                'confidence': float(pred['confidence']),
+                'trend': 'up' if pred['predicted_occupancy'] > pred['current_occupancy'] else 'down'
+            }
+        })
+    
+    return serialize({
+        'lat': lat,
+        'lon': lon,
+        'radius_km': radius,
+        'hours_ahead': hours_ahead,
+        'lots': lots,
+        'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/api/analytics/summary')
 def get_analytics():
-    """Get analytics summary"""
-    if df_data is None:
+    """Get analytics summary
+
+    Served from the store's running aggregates, so the cost does not grow with the history.
+    """
+    if store is None:
         return jsonify({'error': 'No data available'}), 404
     
-    current = get_current_data()
-    
-    # Calculate statistics
     stats = {
-        'total_records': len(df_data),
+        'total_records': store.n_records,
         'date_range': {
-            'start': df_data['timestamp'].min().isoformat(),
-            'end': df_data['timestamp'].max().isoformat()
+            'start': pd.Timestamp(store.start_time).isoformat(),
+            'end': pd.Timestamp(store.latest_time).isoformat()
         },
-        'parking_lots': int(df_data['lot_id'].nunique()),
-        'current_stats': {
-            'average_occupancy': float(current['occupancy_rate'].mean()),
-            'busiest_lot': current.nlargest(1, 'occupancy_rate').iloc[0]['lot_name'],
-            'most_available_lot': current.nsmallest(1, 'occupancy_rate').iloc[0]['lot_name'],
-            'total_capacity': int(current['capacity'].sum()),
-            'total_available': int(current['available_slots'].sum())
-        }
+        'parking_lots': len(store.lot_ids),
+        'current_stats': store.aggregates.current,
+        'history_stats': store.aggregates.overall()
     }
     
     if model_info:
         stats['model_performance'] = model_info.get('metrics', {})
+        if 'quantization' in model_info:
+            stats['quantization'] = model_info['quantization']
     
     return jsonify(stats)
 
+@app.route('/api/analytics/lots')
+def get_lot_analytics():
+    """Mean and peak occupancy of every lot over its whole history"""
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    lots = store.aggregates.lots()
+    for lot in lots:
+        lot['lot_name'] = store.lot_info[lot['lot_id']]['lot_name']
+    
+    return jsonify({'lots': lots})
+
+@app.route('/api/analytics/zones')
+def get_zone_analytics():
+    """Mean and peak occupancy of every zone type"""
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    return jsonify({'zones': store.aggregates.by_zone()})
+
+@app.route('/api/analytics/profile')
+def get_occupancy_profile():
+    """Typical occupancy per hour of the week (`?period=day`: per hour of the day)
+
+    `?zone=office` or `?lot_id=LOT_001` narrow the profile; the default covers all lots.
+    """
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    period = request.args.get('period', 'week')
+    zone = request.args.get('zone')
+    lot_id = request.args.get('lot_id')
+    
+    if period not in ('week', 'day'):
+        return jsonify({'error': "period must be 'week' or 'day'"}), 400
+    if zone is not None and zone not in store.aggregates.zones:
+        return jsonify({'error': f'Unknown zone: {zone}'}), 404
+    if lot_id is not None and lot_id not in store:
+        return jsonify({'error': f'Unknown lot: {lot_id}'}), 404
+    
+    lot_codes = None
+    if lot_id is not None:
+        lot_codes = [store.lot_codes[lot_id]]
+    elif zone is not None:
+        lot_codes = np.flatnonzero(store.aggregates.lot_zone == store.aggregates.zones.index(zone))
+    
+    return jsonify({
+        'period': period,
+        'zone': zone,
+        'lot_id': lot_id,
+        'profile': store.aggregates.profile(lot_codes, period)
+    })
+
+@app.route('/api/analytics/daily')
+def get_daily_analytics():
+    """Daily mean and peak occupancy, network-wide or for one zone (`?zone=`); `?days=30` keeps the last days"""
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
+    
+    zone = request.args.get('zone')
+    days = request.args.get('days', type=int)
+    
+    if zone is not None and zone not in store.aggregates.zones:
+        return jsonify({'error': f'Unknown zone: {zone}'}), 404
+    if days is not None and days < 1:
+        return jsonify({'error': 'days must be at least 1'}), 400
+    
+    return jsonify({'zone': zone, 'days': store.aggregates.days(zone, days)})
+
+def choose_resolution(hours, max_points):
+    """Finest history resolution that covers `hours` in at most `max_points` buckets (coarsest otherwise)"""
+    for name, step in RESOLUTIONS.items():
+        if hours * 3600 * 10 ** 9 / step <= max_points:
+            return name
+    return list(RESOLUTIONS)[-1]
+
+def history_span_hours():
+    """Whole hours covered by the stored and ingested data (the longest history range served)"""
+    if store is None or store.start_time is None:
+        return 1
+    return max(1, int(np.ceil((store.latest_time - store.start_time) / np.timedelta64(1, 'h'))))
+
+def parse_history_params(params):
+    """Validate history query parameters (query string or JSON body), returning (options, error message)"""
+    try:
+        hours = int(params.get('hours', 24))
+        max_points = int(params['max_points']) if params.get('max_points') is not None else None
+        limit = int(params.get('limit', HISTORY_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return None, 'hours, max_points and limit must be integers'
+    
+    resolution = params.get('resolution')
+    response_format = params.get('format', 'rows')
+    
+    if hours < 1:
+        return None, 'hours must be a positive integer'
+    if hours > history_span_hours():
+        return None, f'hours must be at most {history_span_hours()} (the span of the stored data)'
+    if max_points is not None and max_points < 1:
+        return None, 'max_points must be a positive integer'
+    if resolution is None and max_points is not None:
+        resolution = choose_resolution(hours, max_points)
+    if resolution is not None and resolution not in RESOLUTIONS:
+        return None, f"Unsupported resolution: {resolution}. Choose from {list(RESOLUTIONS)}"
+    if limit < 1:
+        return None, 'limit must be a positive integer'
+    if response_format not in ('rows', 'columnar'):
+        return None, "format must be 'rows' or 'columnar'"
+    
+    return {'hours': hours, 'resolution': resolution, 'limit': min(limit, HISTORY_PAGE_SIZE),
+            'format': response_format}, None
+
+def lot_history(lot_id, options, cursor=None):
+    """History page of one lot, returning (response body, error message, HTTP status)"""
+    if lot_id not in store:
+        return None, 'No history found', 404
+    
+    # Get data for last N hours, resuming after the previous page
+    end_time = pd.Timestamp(store.latest_time)
+    start_time = end_time - timedelta(hours=options['hours'])
+    if cursor:
+        try:
+            start_time = max(start_time, pd.Timestamp(int(cursor, 16)))
+        except (TypeError, ValueError):
+            return None, 'Invalid cursor', 400
+    
+    resolution = options['resolution']
+    if resolution in (None, '15min'):
+        points = store.since(lot_id, start_time, ['timestamp', 'occupancy_rate', 'occupied_slots', 'available_slots'])
+        points['occupied_slots'] = points['occupied_slots'].astype(int)
+        points['available_slots'] = points['available_slots'].astype(int)
+    else:
+        points = store.buckets(lot_id, start_time, resolution)
+        capacity = int(store.lot_info[lot_id]['capacity'])
+        points['available_slots'] = capacity - np.round(points['occupancy_rate'] * capacity).astype(int)
+    
+    if len(points['timestamp']) == 0:
+        return None, 'No history found', 404
+    
+    limit = options['limit']
+    next_cursor = None
+    if len(points['timestamp']) > limit:
+        next_cursor = format(int(points['timestamp'][limit].astype('datetime64[ns]').astype(np.int64)), 'x')
+        points = {col: values[:limit] for col, values in points.items()}
+    
+    response = {
+        'lot_id': lot_id,
+        'lot_name': store.lot_info[lot_id]['lot_name'],
+        'hours': options['hours'],
+        'resolution': resolution or '15min',
+        'count': len(points['timestamp']),
+        'next_cursor': next_cursor
+    }
+    
+    timestamps = pd.DatetimeIndex(points.pop('timestamp'))
+    columns = {col: values.tolist() for col, values in points.items()}
+    
+    if options['format'] == 'columnar':
+        response['timestamp_unit'] = 'ms'
+        response['columns'] = dict(timestamp=(timestamps.asi8 // 10 ** 6).tolist(), **columns)
+    else:
+        response['history'] = [
+            {'timestamp': timestamp.isoformat(), **dict(zip(columns, values))}
+            for timestamp, *values in zip(timestamps, *columns.values())
+        ]
+    
+    return response, None, 200
+
 @app.route('/api/parking/history/<lot_id>')
 def get_history(lot_id):
-    """Get historical data for a parking lot"""
-    if df_data is None:
+    """Get historical data for a parking lot
+
+    `?resolution=1h` (15min, 1h, 6h or 1d) or `?max_points=200` returns buckets with the
+    mean, min and max occupancy, served from precomputed rollups. Pages hold at most
+    `limit` points; pass `next_cursor` back as `?cursor=` to get the next page.
+    `?format=columnar` returns parallel arrays instead of one object per point.
+    """
+    if store is None:
         return jsonify({'error': 'No data available'}), 404
     
-    hours = request.args.get('hours', default=24, type=int)
+    options, error = parse_history_params(request.args)
+    if error:
+        return jsonify({'error': error}), 400
     
-    # Get data for last N hours
-    end_time = df_data['timestamp'].max()
-    start_time = end_time - timedelta(hours=hours)
+    response, error, status = lot_history(lot_id, options, request.args.get('cursor'))
+    if error:
+        return jsonify({'error': error}), status
     
-    lot_history = df_data[
-        (df_data['lot_id'] == lot_id) & 
-        (df_data['timestamp'] >= start_time)
-    ].copy()
+    return jsonify(response)
+
+@app.route('/api/parking/history/batch', methods=['GET', 'POST'])
+def get_history_batch():
+    """History of a list of lots in one request
+
+    Takes the single-lot parameters plus `lot_ids`; a JSON body may map lot IDs to
+    `cursors` to continue paginated lots. Lots without history are reported inline.
+    """
+    if store is None:
+        return jsonify({'error': 'No data available'}), 404
     
-    if len(lot_history) == 0:
-        return jsonify({'error': 'No history found'}), 404
+    lot_ids, params, error = batch_request()
+    if error:
+        return jsonify({'error': error}), 400
     
-    history = []
-    for _, row in lot_history.iterrows():
-        history.append({
-            'timestamp': row['timestamp'].isoformat(),
-            'occupancy_rate': float(row['occupancy_rate']),
-            'occupied_slots': int(row['occupied_slots']),
-            'available_slots': int(row['available_slots'])
-        })
+    options, error = parse_history_params(params)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    cursors = params.get('cursors') or {}
+    if not isinstance(cursors, dict):
+        return jsonify({'error': 'cursors must map lot IDs to cursors'}), 400
+    
+    results = []
+    for lot_id in lot_ids:
+        response, error, _ = lot_history(lot_id, options, cursors.get(lot_id))
+        results.append(response if error is None else {'lot_id': lot_id, 'error': error})
     
     return jsonify({
-        'lot_id': lot_id,
-        'lot_name': lot_history.iloc[0]['lot_name'],
-        'hours': hours,
-        'history': history
+        'hours': options['hours'],
+        'resolution': options['resolution'] or '15min',
+        'results': results,
+        'errors': sum('error' in result for result in results)
     })
 
+def create_app(background=False):
+    """Application factory for WSGI servers: loads data and model once, then returns the app
+
+    Under a pre-forking server (see gunicorn.conf.py) this runs in the master
+    process, so every worker shares the loaded arrays and weights copy-on-write.
+    With `background`, loading runs on a thread and the app is returned at once:
+    /api/live answers immediately and /api/ready turns 200 when loading is done.
+    """
+    if store is None or model is None:
+        if background:
+            threading.Thread(target=load_models, name='startup-load', daemon=True).start()
+        elif not load_models():
+            raise RuntimeError("Failed to load data/models; run generate_data.py and train_model.py first")
+    
+    return app
+
 if __name__ == '__main__':
     print("="*60)
     print("🚗 PARKING PREDICTION API - STARTING")
@@ -342,11 +1404,14 @@ if __name__ == '__main__':
     
     # Load models on startup
     if load_models():
+        start_registry_watcher()
         print("\n🌐 Starting Flask server...")
         print("   API: http://127.0.0.1:5000/api/status")
         print("   Dashboard: http://127.0.0.1:5000")
         print("\n✨ Server is ready!\n")
         
+        # The development server starts a thread per connection, so streams take none from a pool
+        MAX_STREAM_CLIENTS = int(os.environ.get('PARKING_MAX_STREAM_CLIENTS', 100))
         app.run(host='127.0.0.1', port=5000, debug=True, use_reloader=False)
     else:
         print("\n❌ Failed to load models. Please run:")
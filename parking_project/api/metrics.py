@@ -0,0 +1,135 @@
+"""
+Metrics for the Parking API
+Counters and latency histograms rendered in the Prometheus text exposition format
+"""
+import math
+import threading
+import time
+
+from flask import g, request
+
+# Latency histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Thread-safe registry of counters, histograms and callback gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}         # name -> (type, help)
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+        self._buckets = {}      # histogram name -> bucket bounds
+        self._callbacks = {}    # name -> fn returning {labels tuple: value}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def counter(self, name, help):
+        self._meta[name] = ('counter', help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help)
+        self._buckets[name] = tuple(buckets)
+
+    def callback(self, name, kind, help, fn):
+        """Metric whose samples are read from `fn()` ({label pairs tuple or None: value}) at render time"""
+        self._meta[name] = (kind, help)
+        self._callbacks[name] = fn
+
+    def inc(self, name, labels=None, value=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        key = self._key(name, labels)
+        buckets = self._buckets[name]
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def observe_stages(self, name, timer, labels=None):
+        """Observe every stage of a StageTimer (seconds) under a `stage` label"""
+        for stage, seconds in timer.durations.items():
+            self.observe(name, seconds, dict(labels or {}, stage=stage))
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(state) for key, state in self._histograms.items()}
+
+        for name, (kind, help) in sorted(self._meta.items()):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+
+            if name in self._callbacks:
+                for labels, value in self._callbacks[name]().items():
+                    lines.append(f'{name}{_format_labels(self._key(name, dict(labels or ()))[1])} {_format_value(value)}')
+            elif kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            elif kind == 'histogram':
+                bounds = self._buckets[name] + (math.inf,)
+                for (metric, labels), state in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = state[:len(bounds) - 1] + [state[-1]]
+                    for bound, count in zip(bounds, cumulative):
+                        bucket_labels = labels + (('le', _format_value(bound)),)
+                        lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {count}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(state[-2])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {state[-1]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def instrument(self, app):
+        """Record request counts and latency per route template for a Flask app
+
+        Call right after creating the app so the timing hook runs before all others.
+        """
+        self.counter('parking_http_requests_total', 'HTTP requests by route, method and status')
+        self.histogram('parking_http_request_duration_seconds', 'HTTP request latency by route and method')
+
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop('metrics_started', None)
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            labels = {'route': route, 'method': request.method}
+
+            self.inc('parking_http_requests_total', dict(labels, status=response.status_code))
+            if started is not None:
+                self.observe('parking_http_request_duration_seconds', time.perf_counter() - started, labels)
+            return response
+
+        return app
@@ -0,0 +1,70 @@
+"""
+Pre-Serialized HTTP Responses
+Serializes a JSON payload once, precompresses it and answers conditional GETs
+"""
+import gzip
+import hashlib
+import json
+import zlib
+from datetime import datetime, timezone
+
+from flask import Response
+from werkzeug.http import http_date
+
+# Content codings in order of preference
+ENCODINGS = ('gzip', 'deflate')
+
+
+class PreparedResponse:
+    """Immutable serialized payload with a strong ETag and precompressed variants
+
+    `last_modified` should be when the underlying data last changed (defaults to now).
+    """
+
+    def __init__(self, payload, version=None, last_modified=None):
+        self.version = version
+        self.body = (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.last_modified = (last_modified or datetime.now(timezone.utc)).replace(microsecond=0)
+        self.variants = {
+            None: self.body,
+            'gzip': gzip.compress(self.body, compresslevel=6, mtime=0),
+            'deflate': zlib.compress(self.body, 6),
+        }
+
+    def variant_etag(self, encoding):
+        """Strong ETags must differ between encodings of the same resource"""
+        return self.etag if encoding is None else f'{self.etag}-{encoding}'
+
+    def negotiate(self, request):
+        """Best precompressed encoding accepted by the client, or None for identity"""
+        for encoding in ENCODINGS:
+            if request.accept_encodings[encoding] > 0:
+                return encoding
+        return None
+
+    def is_fresh(self, request, encoding):
+        """True if the client's cached copy is still current (If-None-Match, then If-Modified-Since)"""
+        if request.if_none_match:
+            return request.if_none_match.contains(self.variant_etag(encoding)) or \
+                request.if_none_match.contains(self.etag)
+        if request.if_modified_since is not None:
+            return self.last_modified <= request.if_modified_since
+        return False
+
+    def to_response(self, request):
+        """Flask response for `request`: 304 when fresh, else the negotiated body"""
+        encoding = self.negotiate(request)
+        headers = {
+            'ETag': f'"{self.variant_etag(encoding)}"',
+            'Last-Modified': http_date(self.last_modified),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+
+        if self.is_fresh(request, encoding):
+            return Response(status=304, headers=headers)
+
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return Response(self.variants[encoding], status=200, headers=headers, mimetype='application/json')
@@ -0,0 +1,71 @@
+"""
+Sampling Profiler for Single Requests
+Samples threads' Python stacks at a fixed interval and reports folded stacks
+(the input format of flamegraph.pl / speedscope)
+"""
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """Background sampler of other threads' stacks
+
+    Samples the calling thread by default; pass `thread_ids` to also follow work
+    handed to other threads (e.g. the inference scheduler). Each stack is rooted
+    at its thread's name. Sampling costs the profiled threads nothing but GIL
+    contention, so it is safe to enable for individual production requests.
+    """
+
+    def __init__(self, thread_ids=None, interval=0.001):
+        self.thread_ids = list(thread_ids or [threading.get_ident()])
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = None
+        self.elapsed = 0.0
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def _sample(self):
+        frames = sys._current_frames()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+
+        for thread_id in self.thread_ids:
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                key = ';'.join([names.get(thread_id, str(thread_id))] + stack[::-1])
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def folded(self):
+        """One 'frame;frame;frame count' line per distinct stack, most frequent first"""
+        header = f"# {self.samples} samples every {self.interval * 1000:g} ms over {self.elapsed * 1000:.1f} ms\n"
+        lines = (f"{stack} {count}" for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]))
+        return header + '\n'.join(lines) + '\n'
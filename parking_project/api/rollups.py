@@ -0,0 +1,103 @@
+"""
+Multi-Resolution History Rollups for the Parking API
+Per-lot occupancy buckets (count, mean, min, max) precomputed at several resolutions,
+so long history ranges are served without touching every 15-minute row
+"""
+import numpy as np
+
+MINUTE_NS = 60 * 10 ** 9
+
+# Precomputed bucket widths; '15min' is the raw data and is read from the store directly
+RESOLUTIONS = {
+    '15min': 15 * MINUTE_NS,
+    '1h': 60 * MINUTE_NS,
+    '6h': 6 * 60 * MINUTE_NS,
+    '1d': 24 * 60 * MINUTE_NS,
+}
+ROLLUP_RESOLUTIONS = ['1h', '6h', '1d']
+
+# Rows processed at a time while building (bounds temporary memory)
+BUILD_CHUNK_ROWS = 1 << 22
+
+
+def bucketize(ns, rates, step, breaks=()):
+    """Bucket time-sorted readings by `step`: (bucket starts, counts, sums, mins, maxs)
+
+    `breaks` are extra row positions where a new bucket must start (lot boundaries).
+    """
+    if len(ns) == 0:
+        empty = np.empty(0)
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), empty, empty, empty
+
+    bucket = ns // step
+    edges = np.union1d(np.flatnonzero(np.diff(bucket)) + 1, np.asarray(breaks, dtype=np.int64))
+    edges = np.union1d(edges, [0])
+    counts = np.diff(np.append(edges, len(ns)))
+    return (bucket[edges] * step, counts, np.add.reduceat(rates, edges),
+            np.minimum.reduceat(rates, edges), np.maximum.reduceat(rates, edges))
+
+
+class Rollup:
+    """Buckets of one resolution for every lot, stored lot-major like the store's rows"""
+
+    def __init__(self, step, starts, counts, sums, mins, maxs, lot_bounds):
+        self.step = step
+        self.starts = starts
+        self.counts = counts
+        self.sums = sums
+        self.mins = mins
+        self.maxs = maxs
+        self.lot_bounds = lot_bounds  # Buckets of lot i are [lot_bounds[i], lot_bounds[i + 1])
+
+    def query(self, lot_code, start_ns):
+        """Buckets of a lot from the one containing `start_ns` onwards"""
+        first, last = self.lot_bounds[lot_code], self.lot_bounds[lot_code + 1]
+        first += int(np.searchsorted(self.starts[first:last], start_ns - start_ns % self.step, side='left'))
+        return (self.starts[first:last], self.counts[first:last], self.sums[first:last],
+                self.mins[first:last], self.maxs[first:last])
+
+
+class HistoryRollups:
+    """Rollups of a store's stored rows at every resolution in ROLLUP_RESOLUTIONS"""
+
+    def __init__(self, rollups):
+        self.rollups = rollups
+
+    @classmethod
+    def from_store(cls, store, resolutions=ROLLUP_RESOLUTIONS):
+        """Bucket the history in chunks of whole lots"""
+        bounds = [store.offsets[lot_id] for lot_id in store.lot_ids]
+        parts = {name: [] for name in resolutions}
+        lot_firsts = {name: [] for name in resolutions}
+        totals = dict.fromkeys(resolutions, 0)
+
+        block_start = 0
+        while block_start < len(bounds):
+            block_end = block_start + 1
+            while block_end < len(bounds) and bounds[block_end][1] - bounds[block_start][0] <= BUILD_CHUNK_ROWS:
+                block_end += 1
+
+            start, end = bounds[block_start][0], bounds[block_end - 1][1]
+            lot_starts = np.array([s - start for s, _ in bounds[block_start:block_end]], dtype=np.int64)
+            ns = store.timestamps[start:end].astype('datetime64[ns]').view(np.int64)
+            rates = np.asarray(store.columns['occupancy_rate'][start:end], dtype=np.float64)
+
+            for name in resolutions:
+                buckets = bucketize(ns, rates, RESOLUTIONS[name], lot_starts[lot_starts < len(ns)])
+                # First bucket of each lot: the bucket starting at its first row
+                edges = np.cumsum(np.concatenate(([0], buckets[1])))
+                lot_firsts[name].append(totals[name] + np.searchsorted(edges, lot_starts))
+                totals[name] += len(buckets[0])
+                parts[name].append(buckets)
+            block_start = block_end
+
+        rollups = {}
+        for name in resolutions:
+            columns = [np.concatenate([part[i] for part in parts[name]]) if parts[name] else np.empty(0)
+                       for i in range(5)]
+            lot_bounds = np.append(np.concatenate(lot_firsts[name]) if lot_firsts[name] else [], totals[name])
+            rollups[name] = Rollup(RESOLUTIONS[name], *columns, lot_bounds.astype(np.int64))
+        return cls(rollups)
+
+    def __getitem__(self, resolution):
+        return self.rollups[resolution]
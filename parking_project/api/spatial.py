@@ -0,0 +1,115 @@
+"""
+Spatial Index for Parking Lots
+Uniform latitude/longitude grid answering k-nearest and radius queries by searching
+rings of cells outward from the query point, so cost grows with the lots nearby
+rather than with the number of lots
+"""
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Average number of lots per grid cell when the cell size is chosen automatically
+LOTS_PER_CELL = 4
+MIN_CELL_DEGREES = 0.0005  # ~55 m
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances (km) from one point to arrays of points"""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Lots bucketed into square grid cells of `cell_degrees`"""
+
+    def __init__(self, ids, lats, lons, cell_degrees=None):
+        self.ids = list(ids)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+
+        if cell_degrees is None:
+            # Size cells so the bounding box holds about LOTS_PER_CELL lots per cell
+            area = (np.ptp(self.lats) * np.ptp(self.lons)) if len(self.ids) else 0.0
+            cell_degrees = math.sqrt(area * LOTS_PER_CELL / max(len(self.ids), 1))
+        self.cell = max(cell_degrees, MIN_CELL_DEGREES)
+
+        rows, cols = self._cell_of(self.lats), self._cell_of(self.lons)
+        order = np.lexsort((cols, rows))
+        breaks = np.flatnonzero((np.diff(rows[order]) != 0) | (np.diff(cols[order]) != 0)) + 1
+        self.cells = {(int(rows[group[0]]), int(cols[group[0]])): group
+                      for group in np.split(order, breaks) if len(group)}
+
+        self.row_range = (int(rows.min()), int(rows.max())) if len(rows) else (0, -1)
+        self.col_range = (int(cols.min()), int(cols.max())) if len(cols) else (0, -1)
+
+    @classmethod
+    def from_lot_info(cls, lot_info, **kwargs):
+        """Index every lot with a position in a {lot_id: {'latitude', 'longitude', ...}} mapping"""
+        located = [(lot_id, info['latitude'], info['longitude']) for lot_id, info in lot_info.items()
+                   if info.get('latitude') is not None and info.get('longitude') is not None]
+        ids, lats, lons = zip(*located) if located else ((), (), ())
+        return cls(ids, lats, lons, **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell_of(self, degrees):
+        return np.floor(np.asarray(degrees) / self.cell).astype(np.int64)
+
+    def _ring(self, row, col, r):
+        """Indices of the lots in cells exactly `r` cells away (Chebyshev distance) from (row, col)"""
+        if r == 0:
+            found = self.cells.get((row, col))
+            return [found] if found is not None else []
+
+        cells = []
+        for dc in range(-r, r + 1):
+            cells.append((row - r, col + dc))
+            cells.append((row + r, col + dc))
+        for dr in range(-r + 1, r):
+            cells.append((row + dr, col - r))
+            cells.append((row + dr, col + r))
+        return [self.cells[cell] for cell in cells if cell in self.cells]
+
+    def nearest(self, lat, lon, k=10, radius_km=None):
+        """Up to `k` lots nearest to (lat, lon), optionally within `radius_km`: [(lot_id, km), ...], nearest first"""
+        if not len(self.ids) or k < 1:
+            return []
+
+        row, col = int(self._cell_of(lat)), int(self._cell_of(lon))
+        max_ring = max(abs(row - self.row_range[0]), abs(row - self.row_range[1]),
+                       abs(col - self.col_range[0]), abs(col - self.col_range[1]))
+
+        candidates, distances = [], []
+        for r in range(max_ring + 1):
+            if (2 * r + 1) ** 2 > 2 * len(self.cells):
+                # Far from every lot: scanning all of them beats walking empty rings
+                candidates = [np.arange(len(self.ids))]
+                distances = [haversine_km(lat, lon, self.lats, self.lons)]
+                break
+
+            for indices in self._ring(row, col, r):
+                candidates.append(indices)
+                distances.append(haversine_km(lat, lon, self.lats[indices], self.lons[indices]))
+
+            # Lots in unsearched cells are at least r cells away in latitude or longitude
+            edge_lat = min(abs(lat) + (r + 1) * self.cell, 90.0)
+            reach = r * self.cell * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+            if radius_km is not None and reach >= radius_km:
+                break
+            if sum(len(d) for d in distances) >= k and np.partition(np.concatenate(distances), k - 1)[k - 1] <= reach:
+                break
+
+        if not candidates:
+            return []
+
+        indices, distances = np.concatenate(candidates), np.concatenate(distances)
+        if radius_km is not None:
+            within = distances <= radius_km
+            indices, distances = indices[within], distances[within]
+
+        order = np.argsort(distances, kind='stable')[:k]
+        return [(self.ids[i], float(d)) for i, d in zip(indices[order], distances[order])]
@@ -0,0 +1,335 @@
+"""
+In-Memory Time-Series Store for Parking Data
+Keeps every lot's rows sorted by time in contiguous arrays for O(log n + k) lookups,
+with a fixed-size ring buffer per lot for readings ingested while the API runs
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+from aggregates import OccupancyAggregates
+from generate_data import SAMPLES_PER_HOUR
+from rollups import HistoryRollups, bucketize
+from spatial import GridIndex
+
+LOT_INFO_COLS = ['lot_name', 'zone_type', 'latitude', 'longitude', 'capacity']
+
+# Default live buffer size per lot: 7 days of 15-minute readings
+LIVE_CAPACITY = 7 * 24 * 4
+
+# Smallest live buffer that still holds the longest lag feature (occupancy_24h_ago)
+MIN_LIVE_CAPACITY = 24 * SAMPLES_PER_HOUR
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of one lot's most recent readings, one array per column
+
+    Appending is O(1); once full, each new reading overwrites the oldest one.
+    """
+
+    def __init__(self, dtypes, capacity):
+        self.capacity = capacity
+        self.columns = {col: np.empty(capacity, dtype=dtype) for col, dtype in dtypes.items()}
+        self.size = 0
+        self.head = 0  # Next write position
+        self.evicted = 0
+
+    def append(self, row):
+        for col, values in self.columns.items():
+            values[self.head] = row[col]
+        self.head = (self.head + 1) % self.capacity
+        if self.size == self.capacity:
+            self.evicted += 1
+        else:
+            self.size += 1
+
+    def positions(self, n=None):
+        """Array positions of the last `n` readings (all by default), oldest first"""
+        n = self.size if n is None else min(n, self.size)
+        return (self.head - n + np.arange(n)) % self.capacity
+
+    def value_back(self, col, k):
+        """k-th most recent value of a column (k=1 is the newest), or None if it is not buffered"""
+        if not 1 <= k <= self.size:
+            return None
+        return self.columns[col][(self.head - k) % self.capacity]
+
+    def take(self, positions, columns):
+        return {col: self.columns[col][positions] for col in columns}
+
+    def last(self, col):
+        return self.value_back(col, 1)
+
+
+class LotStore:
+    """Per-lot index over the parking history
+
+    Columns are stored once, sorted by (lot, timestamp), so the rows of lot i
+    occupy the contiguous range [offsets[i], offsets[i + 1]) of every array.
+    The arrays may be memory-mapped; the store never copies them.
+
+    Ingested readings go to per-lot ring buffers and are read as if they
+    followed the lot's stored rows. Only the last `live_capacity` ingested
+    readings of a lot are kept. Once older ones were evicted the stored rows no
+    longer precede the ring, so lookbacks (last_n, windows, value_back) stop at
+    the oldest buffered reading instead of crossing the gap.
+
+    Running occupancy aggregates (see aggregates.py) cover the stored history
+    and every ingested reading; history rollups (see rollups.py) are
+    precomputed for the stored rows, and lots are indexed by location (see spatial.py).
+    """
+
+    def __init__(self, columns, lot_ids, offsets, lot_info, live_capacity=LIVE_CAPACITY):
+        if live_capacity < MIN_LIVE_CAPACITY:
+            raise ValueError(f"live_capacity must be at least {MIN_LIVE_CAPACITY} readings "
+                             f"(the 24h lag feature), got {live_capacity}")
+
+        self.columns = dict(columns)
+        if self.columns['timestamp'].dtype != np.dtype('datetime64[ns]'):
+            self.columns['timestamp'] = self.columns['timestamp'].view('datetime64[ns]')
+
+        self.timestamps = self.columns['timestamp']
+        self.n_base_records = len(self.timestamps)
+        self.n_records = self.n_base_records
+        self.lot_ids = list(lot_ids)
+        self.lot_codes = {lot_id: i for i, lot_id in enumerate(self.lot_ids)}
+        self.offsets = {
+            lot_id: (int(offsets[i]), int(offsets[i + 1])) for i, lot_id in enumerate(self.lot_ids)
+        }
+        self.lot_info = lot_info
+
+        self.live = {}
+        self.live_capacity = live_capacity
+        self.n_ingested = 0
+        self.lock = threading.RLock()
+
+        self.start_time = self.timestamps.min() if self.n_records else None
+        self.latest_time = self.timestamps.max() if self.n_records else None
+
+        self.aggregates = OccupancyAggregates.from_store(self)
+        self.rollups = HistoryRollups.from_store(self)
+        self.spatial = GridIndex.from_lot_info(self.lot_info)
+        self._build_snapshot()
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build the store from a DataFrame in any row order"""
+        df = df.sort_values(['lot_id', 'timestamp'], kind='stable').reset_index(drop=True)
+
+        lot_col = df['lot_id'].to_numpy()
+        boundaries = np.flatnonzero(lot_col[1:] != lot_col[:-1]) + 1
+        starts = np.concatenate(([0], boundaries)) if len(df) else np.array([], dtype=int)
+        offsets = np.append(starts, len(df))
+        lot_ids = [str(lot_id) for lot_id in lot_col[starts]]
+
+        # Static lot metadata from each lot's first row
+        info_cols = [col for col in LOT_INFO_COLS if col in df.columns]
+        lot_info = dict(zip(lot_ids, df.iloc[starts][info_cols].to_dict('records')))
+
+        columns = {
+            col: np.ascontiguousarray(df[col].to_numpy())
+            for col in df.columns if col not in info_cols and col != 'lot_id'
+        }
+        columns['timestamp'] = columns['timestamp'].astype('datetime64[ns]')
+
+        return cls(columns, lot_ids, offsets, lot_info, **kwargs)
+
+    @classmethod
+    def from_columnar(cls, data, **kwargs):
+        """Build the store directly on (possibly memory-mapped) columnar data"""
+        return cls(data.columns, data.lot_ids, data.lot_offsets, data.lot_info(), **kwargs)
+
+    def _build_snapshot(self):
+        """Precompute the latest row of every lot and bump the version"""
+        last_rows = np.array([end - 1 for _, end in self.offsets.values()], dtype=int)
+        latest = {col: values[last_rows] for col, values in self.columns.items()}
+
+        # Lots with ingested readings: their newest reading is in the ring buffer
+        for lot_id, ring in self.live.items():
+            i = self.lot_codes[lot_id]
+            for col in latest:
+                latest[col][i] = ring.last(col)
+
+        snapshot = {'lot_id': list(self.lot_ids)}
+        for col in LOT_INFO_COLS:
+            snapshot[col] = [self.lot_info[lot_id][col] for lot_id in self.lot_ids]
+        snapshot.update(latest)
+
+        self.snapshot = pd.DataFrame(snapshot)
+        self.latest_rows = {row['lot_id']: row for row in self.snapshot.to_dict('records')}
+        self.aggregates.update_current(self.snapshot)
+
+        # Changes whenever the data changes; used to key caches
+        self.version = f"{self.n_records}:{self.latest_time}:{self.n_ingested}"
+
+    def __contains__(self, lot_id):
+        return lot_id in self.offsets
+
+    def _slice(self, start, end, columns=None):
+        names = self.columns.keys() if columns is None else columns
+        return {col: self.columns[col][start:end] for col in names}
+
+    def _with_live(self, lot_id, base, positions, columns):
+        """Append ring buffer rows at `positions` to base column slices"""
+        names = self.columns.keys() if columns is None else columns
+        recent = self.live[lot_id].take(positions, names)
+        return {col: np.concatenate((base[col], recent[col])) for col in names}
+
+    def last_n(self, lot_id, n, columns=None):
+        """Last `n` contiguous rows of a lot as column arrays (views unless readings were ingested)
+
+        Fewer rows are returned if the lot has fewer, or if its ring evicted readings
+        (the stored rows then no longer precede the buffered ones).
+        """
+        start, end = self.offsets[lot_id]
+        with self.lock:
+            ring = self.live.get(lot_id)
+            if ring is None:
+                return self._slice(max(start, end - n), end, columns)
+
+            positions = ring.positions(n)
+            first = end if ring.evicted else max(start, end - (n - len(positions)))
+            base = self._slice(first, end, columns)
+            return self._with_live(lot_id, base, positions, columns)
+
+    def since(self, lot_id, start_time, columns=None):
+        """Rows of a lot with timestamp >= start_time as column arrays"""
+        start, end = self.offsets[lot_id]
+        start_time = np.datetime64(start_time, 'ns')
+        first = start + int(np.searchsorted(self.timestamps[start:end], start_time, side='left'))
+        with self.lock:
+            ring = self.live.get(lot_id)
+            if ring is None:
+                return self._slice(first, end, columns)
+
+            positions = ring.positions()
+            positions = positions[np.searchsorted(ring.columns['timestamp'][positions], start_time, side='left'):]
+            return self._with_live(lot_id, self._slice(first, end, columns), positions, columns)
+
+    def buckets(self, lot_id, start_time, resolution):
+        """Occupancy buckets of a lot at a rollup resolution, from the bucket containing start_time
+
+        Returns column arrays: timestamp (bucket start), readings, occupancy_rate (mean),
+        occupancy_min and occupancy_max. Ingested readings are bucketed on the fly and
+        merged into the precomputed buckets of the stored rows.
+        """
+        rollup = self.rollups[resolution]
+        start_ns = int(np.datetime64(start_time, 'ns').astype(np.int64))
+        starts, counts, sums, mins, maxs = rollup.query(self.lot_codes[lot_id], start_ns)
+
+        with self.lock:
+            ring = self.live.get(lot_id)
+            if ring is not None and ring.size:
+                positions = ring.positions()
+                ns = ring.columns['timestamp'][positions].astype('datetime64[ns]').view(np.int64)
+                keep = ns >= start_ns - start_ns % rollup.step
+                rates = ring.columns['occupancy_rate'][positions][keep].astype(np.float64)
+                live = bucketize(ns[keep], rates, rollup.step)
+
+                if len(live[0]):
+                    # A bucket can span the last stored rows and the first ingested ones
+                    join = len(starts) - 1 if len(starts) and starts[-1] == live[0][0] else None
+                    starts, counts, sums, mins, maxs = (
+                        np.concatenate((base, recent)) for base, recent in zip((starts, counts, sums, mins, maxs), live))
+                    if join is not None:
+                        counts[join] += counts[join + 1]
+                        sums[join] += sums[join + 1]
+                        mins[join] = min(mins[join], mins[join + 1])
+                        maxs[join] = max(maxs[join], maxs[join + 1])
+                        starts, counts, sums, mins, maxs = (
+                            np.delete(values, join + 1) for values in (starts, counts, sums, mins, maxs))
+
+        return {
+            'timestamp': starts.astype('datetime64[ns]'),
+            'readings': counts,
+            'occupancy_rate': sums / np.maximum(counts, 1),
+            'occupancy_min': mins,
+            'occupancy_max': maxs,
+        }
+
+    def count(self, lot_id):
+        """Number of contiguous rows of a lot ending at its newest one (the most any lookback can use)"""
+        start, end = self.offsets.get(lot_id, (0, 0))
+        ring = self.live.get(lot_id)
+        if ring is None:
+            return end - start
+        return ring.size if ring.evicted else end - start + ring.size
+
+    def windows(self, lot_ids, n, columns):
+        """Stack the last `n` rows of each lot into (n_lots, n) arrays per column
+
+        Lots that are unknown or have fewer than `n` rows are skipped.
+        """
+        complete = [lot_id for lot_id in dict.fromkeys(lot_ids) if self.count(lot_id) >= n]
+        ends = np.array([self.offsets[lot_id][1] for lot_id in complete], dtype=int)
+        index = ends[:, None] - n + np.arange(n)[None, :] if len(complete) else np.empty((0, n), dtype=int)
+        stacked = {col: self.columns[col][np.maximum(index, 0)] for col in columns}
+
+        # Lots with ingested readings are gathered across their base rows and ring buffer
+        for i, lot_id in enumerate(complete):
+            if lot_id in self.live:
+                for col, values in self.last_n(lot_id, n, columns).items():
+                    stacked[col][i] = values
+
+        return complete, stacked
+
+    def latest(self, lot_id):
+        """Latest snapshot row of a lot, or None"""
+        return self.latest_rows.get(lot_id)
+
+    def value_back(self, lot_id, col, k):
+        """Value of a column k rows before the end of a lot's series (k=1 is the newest), or None
+
+        O(1): reads the ring buffer, or the stored rows if fewer than k readings were ingested.
+        None if the row was evicted from the ring buffer.
+        """
+        ring = self.live.get(lot_id)
+        size = ring.size if ring is not None else 0
+        if k <= size:
+            return ring.value_back(col, k)
+        if ring is not None and ring.evicted:
+            return None
+
+        start, end = self.offsets[lot_id]
+        row = end - (k - size)
+        return self.columns[col][row] if row >= start else None
+
+    def last_timestamp(self, lot_id):
+        """Timestamp of a lot's newest row"""
+        ring = self.live.get(lot_id)
+        if ring is not None:
+            return ring.last('timestamp')
+        start, end = self.offsets[lot_id]
+        return self.timestamps[end - 1] if end > start else None
+
+    def append(self, lot_id, row):
+        """Append one reading (a dict with a value for every column) to a lot's ring buffer
+
+        Call `commit()` after a batch of appends to publish the new snapshot and version.
+        """
+        with self.lock:
+            ring = self.live.get(lot_id)
+            if ring is None:
+                dtypes = {col: values.dtype for col, values in self.columns.items()}
+                ring = self.live[lot_id] = RingBuffer(dtypes, self.live_capacity)
+
+            row = dict(row)
+            if 'lot_code' in self.columns:
+                row['lot_code'] = self.lot_codes[lot_id]
+
+            evicted = ring.evicted
+            ring.append(row)
+            self.n_records += 1 - (ring.evicted - evicted)
+            self.n_ingested += 1
+            self.aggregates.add(self.lot_codes[lot_id], row['timestamp'], row['occupancy_rate'])
+
+            timestamp = np.datetime64(row['timestamp'], 'ns')
+            if self.latest_time is None or timestamp > self.latest_time:
+                self.latest_time = timestamp
+            if self.start_time is None:
+                self.start_time = timestamp
+
+    def commit(self):
+        """Rebuild the latest-row snapshot and version after appends"""
+        with self.lock:
+            self._build_snapshot()
@@ -0,0 +1,41 @@
+"""
+Stage Timing for the Parking API
+Records how long each named step of a multi-step operation takes
+"""
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Ordered wall-clock durations of named stages
+
+    Usage:
+        timer = StageTimer()
+        with timer.stage('model_load'):
+            ...
+        timer.as_dict()  # {'model_load': 12.3, 'total': 12.3} in milliseconds
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + self.clock() - started
+
+    def as_dict(self, digits=2):
+        """Durations in milliseconds, plus their total"""
+        timings = {name: round(seconds * 1000, digits) for name, seconds in self.durations.items()}
+        timings['total'] = round(sum(self.durations.values()) * 1000, digits)
+        return timings
+
+    def report(self, title):
+        """Print the breakdown, one stage per line"""
+        print(f"⏱️  {title}:")
+        for name, ms in self.as_dict().items():
+            print(f"   {name:<16} {ms:>10.1f} ms")
@@ -0,0 +1,15 @@
+"""
+WSGI Entry Point for Production Serving
+Loads the data and model at import time so pre-forking servers share them across workers
+
+    gunicorn -c gunicorn.conf.py wsgi:app                        (Linux/macOS, run from api/)
+    waitress-serve --listen=127.0.0.1:5000 --threads=24 wsgi:app (Windows, run from api/)
+
+Set PARKING_BACKGROUND_LOAD=1 (non-forking servers only) to start answering liveness
+probes at once and report readiness on /api/ready when loading completes.
+"""
+import os
+
+from main import create_app
+
+app = create_app(background=os.environ.get('PARKING_BACKGROUND_LOAD') == '1')
@@ -0,0 +1,302 @@
+"""
+Benchmark Suite for the Parking API and Training Pipeline
+Generates a dataset of configurable size, then measures API startup, endpoint latency
+and throughput, and training feature preparation; results are written as JSON
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(SCRIPTS_DIR, '..', 'api')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from columnar import read_columnar
+from generate_data import generate_parking_data
+
+# Benchmark defaults
+DEFAULT_LOTS = 10
+DEFAULT_DAYS = 60
+DEFAULT_CONCURRENCY = [1, 4, 16]
+DEFAULT_REQUESTS = 200  # Per endpoint, cache mode and concurrency level
+
+# Figures reported by --compare (counts and configuration are skipped)
+COMPARED_SUFFIXES = ('seconds', '_ms', '_mb', '_rps')
+
+# Endpoints measured; {lot} is filled round-robin with the dataset's lot ids
+ENDPOINTS = {
+    'current': '/api/parking/current',
+    'predict': '/api/parking/predict/{lot}',
+    'predict_all': '/api/parking/predict/all',
+    'history': '/api/parking/history/{lot}?hours=24',
+    'analytics_summary': '/api/analytics/summary',
+}
+
+
+def measure(fn, memory=True):
+    """Run `fn` once for wall time, then (optionally) again under tracemalloc for memory
+
+    Tracing slows allocation-heavy code down, so time and memory come from separate runs.
+    """
+    gc.collect()
+    started = time.perf_counter()
+    result = fn()
+    stats = {'seconds': round(time.perf_counter() - started, 4)}
+
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats['retained_mb'] = round(current / 2 ** 20, 2)
+        stats['peak_mb'] = round(peak / 2 ** 20, 2)
+
+    return result, stats
+
+
+def latency_summary(latencies, wall, errors):
+    """Percentiles (ms) and throughput of one endpoint run"""
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+def run_endpoint(app, paths, concurrency):
+    """Issue every path from `concurrency` threads (one test client each)"""
+    def worker(chunk):
+        client = app.test_client()
+        latencies, errors = [], 0
+        for path in chunk:
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+        return latencies, errors
+
+    chunks = [paths[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, chunks))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for chunk_latencies, _ in results for latency in chunk_latencies]
+    return latency_summary(latencies, wall, sum(errors for _, errors in results))
+
+
+def benchmark_api(data_dir, concurrency_levels, n_requests, cache_modes, memory):
+    """Startup cost of load_models plus per-endpoint latency through Flask's test client"""
+    sys.path.insert(0, API_DIR)
+    import main
+    from cache import LRUCache
+
+    main.DATA_PATH = os.path.join(data_dir, 'parking_data.csv')
+    main.COLUMNAR_PATH = os.path.join(data_dir, 'parking_data.cols')
+    # Feature store entries of the benchmark dataset stay with it (pruning could evict the real ones)
+    main.FEATURES_DIR = os.path.join(data_dir, 'features')
+
+    loaded, load_stats = measure(main.load_models, memory)
+    if not loaded:
+        raise RuntimeError("load_models failed; train a model first (scripts/train_model.py)")
+    load_stats['timings_ms'] = main.startup.get('timings_ms')
+
+    lot_ids = list(main.store.lot_ids)
+    warm_caches = main.prediction_cache, main.response_cache
+    endpoints = {}
+    cold = {'on': False}
+
+    @main.app.before_request
+    def drop_current_snapshot():
+        # /api/parking/current serves a prepared snapshot outside the LRU caches
+        if cold['on']:
+            main.current_snapshot = None
+
+    for mode in cache_modes:
+        # Cold: entries expire as soon as they are stored and the current snapshot is
+        # rebuilt per request, so every request recomputes
+        cold['on'] = mode == 'cold'
+        if cold['on']:
+            main.prediction_cache = LRUCache(main.PREDICTION_CACHE_SIZE, ttl=0)
+            main.response_cache = LRUCache(main.RESPONSE_CACHE_SIZE, ttl=0)
+        else:
+            main.prediction_cache, main.response_cache = warm_caches
+
+        for name, template in ENDPOINTS.items():
+            paths = [template.format(lot=lot_ids[i % len(lot_ids)]) for i in range(n_requests)]
+            if mode == 'warm':
+                run_endpoint(main.app, paths[:len(lot_ids)], 1)  # Fill the caches first
+
+            print(f"  {mode:<5} {name:<18}", end='', flush=True)
+            results = {}
+            for concurrency in concurrency_levels:
+                results[str(concurrency)] = run_endpoint(main.app, paths, concurrency)
+                print(f" c={concurrency}: {results[str(concurrency)]['p50_ms']:.2f} ms", end='', flush=True)
+            print()
+            endpoints.setdefault(name, {})[mode] = results
+
+    cold['on'] = False
+    main.prediction_cache, main.response_cache = warm_caches
+    return {'load_models': load_stats, 'scheduler': main.scheduler.stats(), 'endpoints': endpoints}
+
+
+def benchmark_training(data_dir, memory):
+    """Time and memory of prepare_features and of create_sequences over every lot"""
+    import pandas as pd
+    from train_model import PREDICTION_HORIZONS, SEQUENCE_LENGTH, create_sequences, prepare_features
+
+    df = read_columnar(os.path.join(data_dir, 'parking_data.cols')).to_frame()
+
+    prepared, prepare_stats = measure(lambda: prepare_features(df.copy()), memory)
+    prepare_stats['sequences'] = len(prepared[0])
+    del prepared
+
+    values = df[['occupancy_rate']].to_numpy(dtype=np.float64)
+    lot_codes, _ = pd.factorize(df['lot_id'])
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(lot_codes))))
+
+    def all_sequences():
+        return [create_sequences(values[start:end], SEQUENCE_LENGTH, PREDICTION_HORIZONS)
+                for start, end in zip(bounds[:-1], bounds[1:])]
+
+    _, sequence_stats = measure(all_sequences, memory)
+    return {'prepare_features': prepare_stats, 'create_sequences': sequence_stats}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args):
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='parking-bench-')
+    results = {
+        'meta': {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {
+            'lots': args.lots,
+            'days': args.days,
+            'seed': args.seed,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'cache_modes': args.cache_modes,
+        },
+    }
+
+    try:
+        print(f"📦 Dataset in {data_dir}")
+        started = time.perf_counter()
+        generate_parking_data(n_lots=args.lots, days=args.days, seed=args.seed, output_format='both',
+                              output_path=os.path.join(data_dir, 'parking_data.csv'),
+                              columnar_path=os.path.join(data_dir, 'parking_data.cols'))
+        results['dataset'] = {
+            'generate_seconds': round(time.perf_counter() - started, 4),
+            'records': read_columnar(os.path.join(data_dir, 'parking_data.cols')).n_rows,
+        }
+
+        if not args.skip_training:
+            print("\n🧠 Training pipeline...")
+            results['training'] = benchmark_training(data_dir, not args.no_memory)
+
+        if not args.skip_api:
+            print("\n🌐 API...")
+            results['api'] = benchmark_api(data_dir, args.concurrency, args.requests,
+                                           args.cache_modes, not args.no_memory)
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    return results
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1} for numeric leaves"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline_path, results):
+    """Print the relative change of every timing, memory and throughput figure against a baseline"""
+    with open(baseline_path) as f:
+        baseline = flatten(json.load(f))
+    current = flatten(results)
+
+    print(f"\n📊 Compared with {baseline_path} (+ is slower / larger, except throughput):")
+    for key in sorted(set(baseline) & set(current)):
+        timed = key.endswith(COMPARED_SUFFIXES) or '.timings_ms.' in key
+        if not timed or not baseline[key]:
+            continue
+        change = (current[key] - baseline[key]) / baseline[key]
+        print(f"   {key:<72} {baseline[key]:>12.3f} -> {current[key]:>12.3f}  {change:+.1%}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the parking API and training pipeline')
+    parser.add_argument('--lots', type=int, default=DEFAULT_LOTS, help='number of parking lots')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='days of history')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the dataset')
+    parser.add_argument('--concurrency', type=lambda s: [int(c) for c in s.split(',')], default=DEFAULT_CONCURRENCY,
+                        help='comma-separated client thread counts')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help='requests per endpoint, cache mode and concurrency level')
+    parser.add_argument('--cache-modes', type=lambda s: s.split(','), default=['warm', 'cold'],
+                        help='warm (caches on), cold (every request recomputes), or both')
+    parser.add_argument('--data-dir', default=None, help='keep the generated dataset here (default: temporary)')
+    parser.add_argument('--output', default=None, help='JSON results path (default: stdout)')
+    parser.add_argument('--compare', default=None, help='baseline JSON results to compare against')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+    parser.add_argument('--skip-api', action='store_true', help='skip the API benchmarks')
+    parser.add_argument('--skip-training', action='store_true', help='skip the training pipeline benchmarks')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    # Progress goes to stderr so stdout carries only the JSON
+    with redirect_stdout(sys.stderr):
+        results = run_benchmarks(args)
+        if args.compare:
+            compare(args.compare, results)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"📁 Results saved to: {args.output}", file=sys.stderr)
+    else:
+        print(output)
@@ -0,0 +1,205 @@
+"""
+Columnar Binary Storage for Parking Data
+Stores each fact column as a raw little-endian array file that can be memory-mapped,
+with lot metadata kept once in a small dimension table
+
+Layout of a dataset directory (e.g. data/parking_data.cols/):
+    meta.json          format version, row count, column dtypes, lot table, categories
+    lot_offsets.bin    int64[n_lots + 1], rows of lot i are [offsets[i], offsets[i + 1])
+    <column>.bin       one file per fact column, rows sorted by (lot_code, timestamp)
+"""
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+
+# Fact columns and their on-disk dtypes (timestamp is int64 nanoseconds since epoch)
+FACT_DTYPES = {
+    'timestamp': '<i8',
+    'lot_code': '<i4',
+    'occupied_slots': '<i4',
+    'available_slots': '<i4',
+    'occupancy_rate': '<f8',
+    'hour': 'i1',
+    'day_of_week': 'i1',
+    'is_weekend': 'i1',
+    'is_holiday': 'i1',
+    'occupancy_1h_ago': '<f8',
+    'occupancy_3h_ago': '<f8',
+    'occupancy_24h_ago': '<f8',
+}
+
+# Lot dimension table (zone_type is stored as a code into categories['zone_type'])
+LOT_COLUMNS = ['lot_id', 'lot_name', 'zone_type', 'latitude', 'longitude', 'capacity']
+
+
+def build_lot_table(df):
+    """Build the lot dimension table and category list from a frame with repeated lot columns"""
+    lots = df.groupby('lot_id', sort=True)[LOT_COLUMNS[1:]].first().reset_index()
+    zone_types = sorted(lots['zone_type'].unique().tolist())
+    zone_codes = pd.Categorical(lots['zone_type'], categories=zone_types).codes
+
+    table = {
+        'lot_id': lots['lot_id'].astype(str).tolist(),
+        'lot_name': lots['lot_name'].astype(str).tolist(),
+        'zone_code': zone_codes.astype(int).tolist(),
+        'latitude': lots['latitude'].astype(float).tolist(),
+        'longitude': lots['longitude'].astype(float).tolist(),
+        'capacity': lots['capacity'].astype(int).tolist(),
+    }
+    return table, {'zone_type': zone_types}
+
+
+def _fact_arrays(df, lot_ids):
+    """Encode a frame's fact columns with the on-disk dtypes, sorted by (lot_code, timestamp)"""
+    lot_code = pd.Categorical(df['lot_id'], categories=lot_ids).codes.astype(np.int32)
+    if (lot_code < 0).any():
+        raise ValueError("Frame contains lots missing from the lot table")
+
+    timestamp = pd.to_datetime(df['timestamp']).to_numpy().astype('datetime64[ns]').view(np.int64)
+    order = np.lexsort((timestamp, lot_code))
+
+    arrays = {'timestamp': timestamp[order], 'lot_code': lot_code[order]}
+    for col, dtype in FACT_DTYPES.items():
+        if col not in arrays:
+            arrays[col] = df[col].to_numpy()[order].astype(dtype)
+    return arrays
+
+
+class ColumnarWriter:
+    """Writes a columnar dataset, optionally in chunks
+
+    Chunks are appended in lot order: each chunk must hold complete lots whose
+    codes are not lower than those already written, so the per-lot ranges stay
+    contiguous without re-sorting on disk.
+    """
+
+    def __init__(self, path, lot_table, categories):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.lot_table = lot_table
+        self.categories = categories
+        self.n_rows = 0
+        self.lot_counts = np.zeros(len(lot_table['lot_id']), dtype=np.int64)
+        self.last_lot_code = -1
+
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.files = {col: open(os.path.join(self.tmp_path, f'{col}.bin'), 'wb') for col in FACT_DTYPES}
+
+    def append(self, df):
+        """Append a chunk of rows (a DataFrame with the CSV columns)"""
+        arrays = _fact_arrays(df, self.lot_table['lot_id'])
+        codes = arrays['lot_code']
+
+        if len(codes) == 0:
+            return
+        if codes[0] <= self.last_lot_code:
+            raise ValueError("Chunks must be appended in lot order without splitting a lot")
+
+        for col, values in arrays.items():
+            self.files[col].write(np.ascontiguousarray(values, dtype=FACT_DTYPES[col]).tobytes())
+
+        self.lot_counts += np.bincount(codes, minlength=len(self.lot_counts))
+        self.last_lot_code = int(codes[-1])
+        self.n_rows += len(codes)
+
+    def close(self):
+        """Finish the dataset and atomically move it into place"""
+        for f in self.files.values():
+            f.close()
+
+        offsets = np.concatenate(([0], np.cumsum(self.lot_counts))).astype('<i8')
+        offsets.tofile(os.path.join(self.tmp_path, 'lot_offsets.bin'))
+
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'n_rows': int(self.n_rows),
+            'columns': FACT_DTYPES,
+            'lots': self.lot_table,
+            'categories': self.categories,
+        }
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        # Readers that already mapped the old files keep their pages until they reopen
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+
+
+def write_columnar(df, path):
+    """Write a full DataFrame (CSV schema) as a columnar dataset"""
+    lot_table, categories = build_lot_table(df)
+    writer = ColumnarWriter(path, lot_table, categories)
+    writer.append(df)
+    writer.close()
+    return path
+
+
+class ColumnarData:
+    """A columnar dataset opened for reading"""
+
+    def __init__(self, path, meta, columns, lot_offsets):
+        self.path = path
+        self.meta = meta
+        self.columns = columns
+        self.lot_offsets = lot_offsets
+        self.lot_ids = meta['lots']['lot_id']
+        self.n_rows = meta['n_rows']
+
+    def lot_table(self):
+        """Lot dimension table as a DataFrame with decoded zone_type"""
+        lots = pd.DataFrame(self.meta['lots'])
+        zone_types = np.array(self.meta['categories']['zone_type'], dtype=object)
+        lots['zone_type'] = zone_types[lots.pop('zone_code').to_numpy()]
+        return lots[LOT_COLUMNS]
+
+    def lot_info(self):
+        """Lot metadata keyed by lot id"""
+        return self.lot_table().set_index('lot_id').to_dict('index')
+
+    def to_frame(self, columns=None):
+        """Materialize the CSV schema as a DataFrame (lot columns are categoricals)"""
+        lots = self.lot_table()
+        codes = np.asarray(self.columns['lot_code'])
+        frame = {'timestamp': np.asarray(self.columns['timestamp']).view('datetime64[ns]')}
+
+        frame['lot_id'] = pd.Categorical.from_codes(codes, categories=lots['lot_id'])
+        for col in LOT_COLUMNS[1:]:
+            if pd.api.types.is_numeric_dtype(lots[col]):
+                frame[col] = lots[col].to_numpy()[codes]
+            else:
+                frame[col] = pd.Categorical(lots[col]).take(codes)
+
+        for col in FACT_DTYPES:
+            if col not in ('timestamp', 'lot_code'):
+                frame[col] = np.asarray(self.columns[col])
+
+        df = pd.DataFrame(frame)
+        return df if columns is None else df[columns]
+
+
+def read_columnar(path, mmap=True):
+    """Open a columnar dataset, memory-mapping its columns by default"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version: {meta.get('format_version')}")
+
+    def load(name, dtype, count):
+        file_path = os.path.join(path, f'{name}.bin')
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        if mmap:
+            return np.memmap(file_path, dtype=dtype, mode='r', shape=(count,))
+        return np.fromfile(file_path, dtype=dtype, count=count)
+
+    n_rows = meta['n_rows']
+    columns = {col: load(col, dtype, n_rows) for col, dtype in meta['columns'].items()}
+    lot_offsets = load('lot_offsets', '<i8', len(meta['lots']['lot_id']) + 1)
+
+    return ColumnarData(path, meta, columns, lot_offsets)
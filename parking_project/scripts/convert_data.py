@@ -0,0 +1,36 @@
+"""
+Convert parking_data.csv to the columnar binary format
+Usage: python scripts/convert_data.py [input.csv] [output.cols]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+from columnar import read_columnar, write_columnar
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CSV_PATH = os.path.join(DATA_DIR, 'parking_data.csv')
+COLUMNAR_PATH = os.path.join(DATA_DIR, 'parking_data.cols')
+
+def convert(csv_path, columnar_path):
+    """Convert a CSV dataset and report load times for both formats"""
+    print(f"📂 Reading {csv_path}...")
+    start = time.perf_counter()
+    df = pd.read_csv(csv_path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    csv_seconds = time.perf_counter() - start
+    print(f"✅ Loaded {len(df):,} records in {csv_seconds:.2f}s")
+    
+    write_columnar(df, columnar_path)
+    print(f"💾 Columnar data saved to: {columnar_path}")
+    
+    start = time.perf_counter()
+    data = read_columnar(columnar_path)
+    mmap_seconds = time.perf_counter() - start
+    print(f"⚡ Memory-mapped {data.n_rows:,} records in {mmap_seconds * 1000:.1f}ms")
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    columnar_path = sys.argv[2] if len(sys.argv) > 2 else COLUMNAR_PATH
+    convert(csv_path, columnar_path)
@@ -1,17 +1,23 @@
 """
 Spatio-Temporal Parking Data Generator
 Generates realistic parking occupancy data with spatial and temporal patterns
+
+Usage: python scripts/generate_data.py [--lots N] [--days D] [--seed S] [--chunk-lots K] [--format csv|columnar|both]
 """
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
 
+from columnar import ColumnarWriter, build_lot_table
+
 # Configuration
 NUM_PARKING_LOTS = 10
 DAYS_TO_GENERATE = 60  # 2 months of data
 SAMPLES_PER_HOUR = 4   # Every 15 minutes
 OUTPUT_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'parking_data.csv')
+COLUMNAR_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'parking_data.cols')
 
 # Define parking lots with spatial features
 PARKING_LOTS = {
@@ -27,150 +33,273 @@ PARKING_LOTS = {
     'LOT_010': {'name': 'Airport Parking', 'capacity': 600, 'zone': 'transport', 'lat': 40.7178, 'lon': -74.0025},
 }
 
-def get_base_occupancy_rate(hour, day_of_week, zone):
-    """Calculate base occupancy rate based on time and zone type"""
-    # Weekend vs Weekday
-    is_weekend = day_of_week >= 5
-    
-    # Zone-specific patterns
+ZONES = ['commercial', 'healthcare', 'office', 'entertainment', 'education', 'residential', 'transport', 'recreation']
+
+# Holiday multipliers applied to the base rate
+HOLIDAY_EFFECT = {'commercial': 1.3, 'entertainment': 1.3, 'recreation': 1.3, 'office': 0.3, 'education': 0.3}
+
+# Temporal correlation: rate = SMOOTHING * previous + (1 - SMOOTHING) * base
+SMOOTHING = 0.7
+
+def zone_base_rates(zone, hour, is_weekend):
+    """Uniform range (low, span) of the base occupancy rate for a zone
+
+    `hour` and `is_weekend` are broadcastable arrays; the base rate is
+    low + span * U(0, 1).
+    """
+    day = lambda start, end: (hour >= start) & (hour <= end)
+
+    # Each zone is a list of (condition, low, span) checked in order, then a default
     if zone == 'office':
-        if is_weekend:
-            return 0.1 + 0.1 * np.random.random()
-        if 8 <= hour <= 18:
-            return 0.7 + 0.2 * np.random.random()
-        return 0.2 + 0.1 * np.random.random()
-    
+        rules, default = [(is_weekend, 0.1, 0.1), (day(8, 18), 0.7, 0.2)], (0.2, 0.1)
     elif zone == 'commercial':
-        if 10 <= hour <= 21:
-            return 0.6 + 0.3 * np.random.random()
-        return 0.2 + 0.15 * np.random.random()
-    
+        rules, default = [(day(10, 21), 0.6, 0.3)], (0.2, 0.15)
     elif zone == 'healthcare':
         # Hospital parking is busy during day
-        if 7 <= hour <= 20:
-            return 0.5 + 0.3 * np.random.random()
-        return 0.3 + 0.2 * np.random.random()
-    
+        rules, default = [(day(7, 20), 0.5, 0.3)], (0.3, 0.2)
     elif zone == 'entertainment':
         # Busy evenings and weekends
-        if is_weekend or (18 <= hour <= 23):
-            return 0.6 + 0.3 * np.random.random()
-        return 0.15 + 0.1 * np.random.random()
-    
+        rules, default = [(is_weekend | day(18, 23), 0.6, 0.3)], (0.15, 0.1)
     elif zone == 'education':
-        if is_weekend:
-            return 0.1 + 0.05 * np.random.random()
-        if 8 <= hour <= 17:
-            return 0.7 + 0.2 * np.random.random()
-        return 0.2 + 0.1 * np.random.random()
-    
+        rules, default = [(is_weekend, 0.1, 0.05), (day(8, 17), 0.7, 0.2)], (0.2, 0.1)
     elif zone == 'residential':
         # Inverse of office hours (people leave for work)
-        if not is_weekend and 8 <= hour <= 18:
-            return 0.3 + 0.1 * np.random.random()
-        return 0.7 + 0.2 * np.random.random()
-    
+        rules, default = [(~is_weekend & day(8, 18), 0.3, 0.1)], (0.7, 0.2)
     elif zone == 'transport':
         # Busy during commute hours
-        if hour in [7, 8, 9, 17, 18, 19]:
-            return 0.8 + 0.15 * np.random.random()
-        return 0.4 + 0.2 * np.random.random()
-    
+        rules, default = [(np.isin(hour, [7, 8, 9, 17, 18, 19]), 0.8, 0.15)], (0.4, 0.2)
     elif zone == 'recreation':
         # Busy during good weather and weekends
-        if is_weekend and 10 <= hour <= 18:
-            return 0.7 + 0.2 * np.random.random()
-        return 0.2 + 0.15 * np.random.random()
-    
-    return 0.3 + 0.2 * np.random.random()
-
-def generate_parking_data():
-    """Generate spatio-temporal parking occupancy dataset"""
-    print("🚗 Generating spatio-temporal parking data...")
-    
-    data = []
-    start_date = datetime.now() - timedelta(days=DAYS_TO_GENERATE)
-    
-    # Generate data for each time step
-    total_samples = DAYS_TO_GENERATE * 24 * SAMPLES_PER_HOUR
-    
-    for i in range(total_samples):
-        timestamp = start_date + timedelta(minutes=i * (60 // SAMPLES_PER_HOUR))
-        hour = timestamp.hour
-        day_of_week = timestamp.weekday()
-        is_holiday = (timestamp.month == 12 and timestamp.day >= 20) or (timestamp.month == 1 and timestamp.day <= 5)
-        
-        # Generate data for each parking lot
-        for lot_id, lot_info in PARKING_LOTS.items():
-            # Base occupancy from temporal and zone patterns
-            base_rate = get_base_occupancy_rate(hour, day_of_week, lot_info['zone'])
-            
-            # Add holiday effect
-            if is_holiday and lot_info['zone'] in ['commercial', 'entertainment', 'recreation']:
-                base_rate *= 1.3
-            elif is_holiday and lot_info['zone'] in ['office', 'education']:
-                base_rate *= 0.3
-            
-            # Add some temporal correlation (smooth transitions)
-            if len(data) >= NUM_PARKING_LOTS and data[-NUM_PARKING_LOTS]['lot_id'] == lot_id:
-                prev_rate = data[-NUM_PARKING_LOTS]['occupancy_rate']
-                base_rate = 0.7 * prev_rate + 0.3 * base_rate
-            
-            # Clip to valid range
-            occupancy_rate = np.clip(base_rate, 0.0, 1.0)
-            occupied_slots = int(occupancy_rate * lot_info['capacity'])
-            available_slots = lot_info['capacity'] - occupied_slots
-            
-            data.append({
-                'timestamp': timestamp,
-                'lot_id': lot_id,
-                'lot_name': lot_info['name'],
-                'zone_type': lot_info['zone'],
-                'latitude': lot_info['lat'],
-                'longitude': lot_info['lon'],
-                'capacity': lot_info['capacity'],
-                'occupied_slots': occupied_slots,
-                'available_slots': available_slots,
-                'occupancy_rate': occupancy_rate,
-                'hour': hour,
-                'day_of_week': day_of_week,
-                'is_weekend': int(day_of_week >= 5),
-                'is_holiday': int(is_holiday),
-            })
-        
-        if i % 10000 == 0:
-            print(f"  Progress: {i}/{total_samples} samples ({100*i/total_samples:.1f}%)")
-    
-    # Create DataFrame
-    df = pd.DataFrame(data)
-    
-    # Add temporal features (lagged values)
-    print("📊 Adding temporal features...")
-    for lot_id in PARKING_LOTS.keys():
-        lot_mask = df['lot_id'] == lot_id
-        df.loc[lot_mask, 'occupancy_1h_ago'] = df.loc[lot_mask, 'occupancy_rate'].shift(4)
-        df.loc[lot_mask, 'occupancy_3h_ago'] = df.loc[lot_mask, 'occupancy_rate'].shift(12)
-        df.loc[lot_mask, 'occupancy_24h_ago'] = df.loc[lot_mask, 'occupancy_rate'].shift(96)
-    
-    # Fill NaN with current occupancy for first rows
-    df['occupancy_1h_ago'].fillna(df['occupancy_rate'], inplace=True)
-    df['occupancy_3h_ago'].fillna(df['occupancy_rate'], inplace=True)
-    df['occupancy_24h_ago'].fillna(df['occupancy_rate'], inplace=True)
-    
-    # Save to CSV
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    df.to_csv(OUTPUT_PATH, index=False)
-    
-    print(f"✅ Generated {len(df):,} records")
-    print(f"📁 Saved to: {OUTPUT_PATH}")
+        rules, default = [(is_weekend & day(10, 18), 0.7, 0.2)], (0.2, 0.15)
+    else:
+        rules, default = [], (0.3, 0.2)
+
+    shape = np.broadcast(hour, is_weekend).shape
+    low, span = np.full(shape, default[0]), np.full(shape, default[1])
+
+    # Apply rules last-to-first so the first matching rule wins
+    for condition, rule_low, rule_span in reversed(rules):
+        condition = np.broadcast_to(condition, shape)
+        low = np.where(condition, rule_low, low)
+        span = np.where(condition, rule_span, span)
+
+    return low, span
+
+def base_rate_tables(zones):
+    """Lookup tables of shape (n_zones, 7 weekdays, 24 hours) for the base rate range"""
+    hour = np.arange(24)[None, :]
+    is_weekend = (np.arange(7) >= 5)[:, None]
+
+    low = np.empty((len(zones), 7, 24))
+    span = np.empty((len(zones), 7, 24))
+    for i, zone in enumerate(zones):
+        low[i], span[i] = zone_base_rates(zone, hour, is_weekend)
+
+    return low, span
+
+def make_parking_lots(n_lots, rng):
+    """The predefined lots, padded with synthetic lots around the city centre"""
+    if n_lots <= len(PARKING_LOTS):
+        return dict(list(PARKING_LOTS.items())[:n_lots])
+
+    # Zero-pad ids so lexical order matches numeric order for any lot count
+    width = max(3, len(str(n_lots)))
+    lots = {
+        f"LOT_{i + 1:0{width}d}": info for i, info in enumerate(PARKING_LOTS.values())
+    }
+
+    n_extra = n_lots - len(lots)
+    zones = rng.choice(ZONES, size=n_extra)
+    capacities = rng.integers(5, 61, size=n_extra) * 10
+    lats = 40.7128 + rng.uniform(-0.1, 0.1, size=n_extra)
+    lons = -74.0060 + rng.uniform(-0.1, 0.1, size=n_extra)
+
+    for j in range(n_extra):
+        i = len(lots) + 1
+        lots[f"LOT_{i:0{width}d}"] = {
+            'name': f"{zones[j].title()} Lot {i}",
+            'capacity': int(capacities[j]),
+            'zone': str(zones[j]),
+            'lat': round(float(lats[j]), 6),
+            'lon': round(float(lons[j]), 6),
+        }
+
+    return lots
+
+def time_axis(days, start_date=None):
+    """Timestamps and calendar features for every 15-minute step"""
+    if start_date is None:
+        start_date = datetime.now() - timedelta(days=days)
+
+    timestamps = pd.date_range(start_date, periods=days * 24 * SAMPLES_PER_HOUR, freq=f'{60 // SAMPLES_PER_HOUR}min')
+    return (timestamps,) + calendar_features(timestamps)
+
+def calendar_features(timestamps):
+    """Hour, weekday and holiday flag arrays for a DatetimeIndex"""
+    hour = timestamps.hour.to_numpy()
+    day_of_week = timestamps.weekday.to_numpy()
+    month, day = timestamps.month.to_numpy(), timestamps.day.to_numpy()
+    is_holiday = ((month == 12) & (day >= 20)) | ((month == 1) & (day <= 5))
+
+    return hour, day_of_week, is_holiday
+
+def lagged(rates, steps):
+    """Shift each lot's series by `steps`, filling the first rows with the current value"""
+    out = rates.copy()
+    out[:, steps:] = rates[:, :-steps]
+    return out
+
+def generate_lot_block(lots, timestamps, hour, day_of_week, is_holiday, rng):
+    """Generate the rows of a block of lots over the whole time axis (lot-major order)"""
+    lot_ids = list(lots.keys())
+    infos = list(lots.values())
+    n_lots, n_steps = len(lot_ids), len(timestamps)
+
+    zones = sorted({info['zone'] for info in infos})
+    zone_idx = np.array([zones.index(info['zone']) for info in infos])
+    capacity = np.array([info['capacity'] for info in infos])
+
+    # Base occupancy from temporal and zone patterns (array lookups)
+    low, span = base_rate_tables(zones)
+    cell = (zone_idx[:, None], day_of_week[None, :], hour[None, :])
+    base = low[cell] + span[cell] * rng.random((n_lots, n_steps))
+
+    # Add holiday effect
+    holiday_factor = np.array([HOLIDAY_EFFECT.get(zone, 1.0) for zone in zones])[zone_idx]
+    base *= np.where(is_holiday[None, :], holiday_factor[:, None], 1.0)
+
+    # Add temporal correlation (smooth transitions), clipping to the valid range each step
+    rates = np.empty_like(base)
+    rates[:, 0] = np.clip(base[:, 0], 0.0, 1.0)
+    for t in range(1, n_steps):
+        rates[:, t] = np.clip(SMOOTHING * rates[:, t - 1] + (1 - SMOOTHING) * base[:, t], 0.0, 1.0)
+
+    occupied = (rates * capacity[:, None]).astype(np.int64)
+
+    def per_lot(values):
+        return np.repeat(np.asarray(values), n_steps)
+
+    def per_step(values):
+        return np.tile(np.asarray(values), n_lots)
+
+    return pd.DataFrame({
+        'timestamp': per_step(timestamps.to_numpy()),
+        'lot_id': per_lot(lot_ids),
+        'lot_name': per_lot([info['name'] for info in infos]),
+        'zone_type': per_lot([info['zone'] for info in infos]),
+        'latitude': per_lot([info['lat'] for info in infos]),
+        'longitude': per_lot([info['lon'] for info in infos]),
+        'capacity': per_lot(capacity),
+        'occupied_slots': occupied.ravel(),
+        'available_slots': (capacity[:, None] - occupied).ravel(),
+        'occupancy_rate': rates.ravel(),
+        'hour': per_step(hour),
+        'day_of_week': per_step(day_of_week),
+        'is_weekend': per_step((day_of_week >= 5).astype(int)),
+        'is_holiday': per_step(is_holiday.astype(int)),
+        # Temporal features (lagged values)
+        'occupancy_1h_ago': lagged(rates, SAMPLES_PER_HOUR).ravel(),
+        'occupancy_3h_ago': lagged(rates, 3 * SAMPLES_PER_HOUR).ravel(),
+        'occupancy_24h_ago': lagged(rates, 24 * SAMPLES_PER_HOUR).ravel(),
+    })
+
+def iter_parking_data(lots, days, rng, chunk_lots=None, start_date=None):
+    """Yield the dataset as DataFrames of `chunk_lots` complete lots each"""
+    timestamps, hour, day_of_week, is_holiday = time_axis(days, start_date)
+
+    lot_ids = list(lots.keys())
+    chunk_lots = chunk_lots or len(lot_ids)
+
+    for i in range(0, len(lot_ids), chunk_lots):
+        block = {lot_id: lots[lot_id] for lot_id in lot_ids[i:i + chunk_lots]}
+        yield generate_lot_block(block, timestamps, hour, day_of_week, is_holiday, rng)
+
+def generate_parking_data(n_lots=NUM_PARKING_LOTS, days=DAYS_TO_GENERATE, seed=None, chunk_lots=None,
+                          output_format='both', output_path=OUTPUT_PATH, columnar_path=COLUMNAR_PATH):
+    """Generate spatio-temporal parking occupancy dataset
+
+    Rows are produced in blocks of `chunk_lots` lots and streamed to the
+    outputs, so memory stays bounded by one block. Returns the DataFrame when
+    the whole dataset is a single block, otherwise None.
+    """
+    print(f"🚗 Generating spatio-temporal parking data ({n_lots:,} lots × {days} days)...")
+
+    rng = np.random.default_rng(seed)
+    lots = make_parking_lots(n_lots, rng)
+    lot_frame = pd.DataFrame({
+        'lot_id': list(lots.keys()),
+        'lot_name': [info['name'] for info in lots.values()],
+        'zone_type': [info['zone'] for info in lots.values()],
+        'latitude': [info['lat'] for info in lots.values()],
+        'longitude': [info['lon'] for info in lots.values()],
+        'capacity': [info['capacity'] for info in lots.values()],
+    })
+
+    write_csv = output_format in ('csv', 'both')
+    write_cols = output_format in ('columnar', 'both')
+    writer = None
+    if write_cols:
+        os.makedirs(os.path.dirname(os.path.abspath(columnar_path)), exist_ok=True)
+        writer = ColumnarWriter(columnar_path, *build_lot_table(lot_frame))
+    if write_csv:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    # Running statistics so nothing but the current block is kept in memory
+    n_records, occupancy_sum, peak = 0, 0.0, 0.0
+    start_time = end_time = None
+    df = None
+
+    chunk_lots = chunk_lots or n_lots
+    for i, df in enumerate(iter_parking_data(lots, days, rng, chunk_lots)):
+        if write_csv:
+            df.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        if writer is not None:
+            writer.append(df)
+
+        n_records += len(df)
+        occupancy_sum += float(df['occupancy_rate'].sum())
+        peak = max(peak, float(df['occupancy_rate'].max()))
+        start_time, end_time = df['timestamp'].iloc[0], df['timestamp'].iloc[-1]
+
+        done = min((i + 1) * chunk_lots, n_lots)
+        print(f"  Progress: {done:,}/{n_lots:,} lots ({100 * done / n_lots:.1f}%)")
+
+    if writer is not None:
+        writer.close()
+
+    print(f"✅ Generated {n_records:,} records")
+    if write_csv:
+        print(f"📁 Saved to: {output_path}")
+    if write_cols:
+        print(f"📁 Columnar copy saved to: {columnar_path}")
     print(f"\n📈 Dataset Statistics:")
-    print(f"  - Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
-    print(f"  - Parking lots: {df['lot_id'].nunique()}")
-    print(f"  - Average occupancy: {df['occupancy_rate'].mean():.2%}")
-    print(f"  - Peak occupancy: {df['occupancy_rate'].max():.2%}")
-    
-    return df
+    print(f"  - Date range: {start_time} to {end_time}")
+    print(f"  - Parking lots: {n_lots:,}")
+    print(f"  - Average occupancy: {occupancy_sum / max(n_records, 1):.2%}")
+    print(f"  - Peak occupancy: {peak:.2%}")
+
+    return df if chunk_lots >= n_lots else None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate synthetic parking occupancy data')
+    parser.add_argument('--lots', type=int, default=NUM_PARKING_LOTS, help='number of parking lots')
+    parser.add_argument('--days', type=int, default=DAYS_TO_GENERATE, help='days of history')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for reproducible data')
+    parser.add_argument('--chunk-lots', type=int, default=None, help='lots generated and written per chunk')
+    parser.add_argument('--format', choices=['csv', 'columnar', 'both'], default='both', help='output format')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='CSV output path')
+    parser.add_argument('--columnar-output', default=COLUMNAR_PATH, help='columnar output directory')
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    df = generate_parking_data()
+    args = parse_args()
+    generate_parking_data(
+        n_lots=args.lots,
+        days=args.days,
+        seed=args.seed,
+        chunk_lots=args.chunk_lots,
+        output_format=args.format,
+        output_path=args.output,
+        columnar_path=args.columnar_output,
+    )
     print("\n🎉 Data generation complete!")
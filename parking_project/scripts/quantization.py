@@ -0,0 +1,80 @@
+"""
+Reduced-Precision Model Weights
+Stores the exported LSTM/Dense kernels as float16 or int8 (symmetric, one scale per
+output unit) for smaller model files. Biases stay float32. The NumPy backend keeps
+kernels at their stored precision and expands each one to float32 only for the
+forward pass that uses it (NumPy has no fast float16 or int8 matmul).
+
+Usage (quantize a version trained before quantized weights were exported):
+    python quantization.py [version]
+"""
+import os
+import sys
+import numpy as np
+
+PRECISIONS = ['float32', 'float16', 'int8']
+QUANTIZED_PRECISIONS = ['float16', 'int8']
+
+INT8_MAX = 127
+
+
+def quantize(values, precision):
+    """Store a float32 kernel at `precision`: (stored values, per-column scales or None)"""
+    if precision == 'float32':
+        return values.astype(np.float32), None
+    if precision == 'float16':
+        return values.astype(np.float16), None
+    if precision == 'int8':
+        # One scale per output unit, so units with small weights keep their resolution
+        scale = np.abs(values).max(axis=0) / INT8_MAX
+        scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+        return np.clip(np.rint(values / scale), -INT8_MAX, INT8_MAX).astype(np.int8), scale
+    raise ValueError(f"Unknown precision: {precision} (expected one of {PRECISIONS})")
+
+
+def stored(data, name):
+    """Array `name` of an exported weights file as stored, with its int8 scales (or None)"""
+    return data[name], data[f'{name}_scale'] if f'{name}_scale' in data else None
+
+
+def expand(values, scale=None, dtype=np.float32):
+    """Stored values as `dtype`, undoing any int8 scaling (no copy if already `dtype` and unscaled)"""
+    values = np.asarray(values, dtype=dtype)
+    return values if scale is None else values * scale.astype(dtype)
+
+
+def dequantize(data, name):
+    """Array `name` of an exported weights file as float32, undoing any int8 scaling"""
+    return expand(*stored(data, name))
+
+
+def quantize_weights(src_path, dst_path, precision):
+    """Copy exported float32 weights with every kernel stored at `precision`; returns the file size in bytes"""
+    with np.load(src_path, allow_pickle=False) as data:
+        arrays = {}
+        for name in data.files:
+            if name.endswith('kernel'):
+                arrays[name], scale = quantize(data[name], precision)
+                if scale is not None:
+                    arrays[f'{name}_scale'] = scale
+            else:
+                arrays[name] = data[name]
+
+    np.savez(dst_path, precision=np.array(precision), **arrays)
+    return os.path.getsize(dst_path)
+
+
+if __name__ == '__main__':
+    from registry import ModelRegistry
+
+    models_dir = os.path.join(os.path.dirname(__file__), '..', 'models')
+    registry = ModelRegistry(models_dir)
+    version = sys.argv[1] if len(sys.argv) > 1 else registry.current()
+    if version is None:
+        sys.exit("No model version to quantize; run train_model.py first")
+
+    paths = registry.artifacts(version)
+    print(f"🔬 Quantizing version {version} ({os.path.getsize(paths['weights']):,} bytes at float32)")
+    for precision in QUANTIZED_PRECISIONS:
+        size = quantize_weights(paths['weights'], paths[f'weights_{precision}'], precision)
+        print(f"   ✅ {precision}: {size:,} bytes -> {paths[f'weights_{precision}']}")
@@ -0,0 +1,95 @@
+"""
+Versioned Model Registry
+Each training run writes its artifacts to a new version directory; a pointer file names
+the version the API should serve
+
+Layout of the models directory:
+    versions/<version>/    parking_predictor.h5, parking_predictor_weights.npz,
+                           parking_predictor_weights_{float16,int8}.npz (quantized),
+                           scaler.pkl, encoder.pkl, model_info.pkl
+    CURRENT                name of the published version (replaced atomically)
+"""
+import os
+from datetime import datetime
+
+# Artifact file names inside a version directory
+ARTIFACTS = {
+    'model': 'parking_predictor.h5',
+    'weights': 'parking_predictor_weights.npz',
+    'weights_float16': 'parking_predictor_weights_float16.npz',
+    'weights_int8': 'parking_predictor_weights_int8.npz',
+    'scaler': 'scaler.pkl',
+    'encoder': 'encoder.pkl',
+    'info': 'model_info.pkl',
+}
+
+
+def artifact_paths(directory):
+    """Paths of every artifact in a model directory"""
+    return {name: os.path.join(directory, filename) for name, filename in ARTIFACTS.items()}
+
+
+class ModelRegistry:
+    """Model versions under `root`, plus the pointer to the published one"""
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        self.pointer_path = os.path.join(root, 'CURRENT')
+
+    def versions(self):
+        """Committed versions, oldest first (names sort chronologically)"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir)
+                      if not name.startswith('.') and os.path.isdir(os.path.join(self.versions_dir, name)))
+
+    def path(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def artifacts(self, version):
+        return artifact_paths(self.path(version))
+
+    def current(self):
+        """Published version, or None if nothing was published yet"""
+        try:
+            with open(self.pointer_path) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and os.path.isdir(self.path(version)) else None
+
+    def previous(self, version):
+        """Version committed before `version`, or None"""
+        older = [v for v in self.versions() if v < version]
+        return older[-1] if older else None
+
+    def stage(self):
+        """Create a hidden staging directory for a new version, returning (version, directory)"""
+        version = datetime.now().strftime('%Y%m%d-%H%M%S')
+        existing = set(self.versions())
+        suffix = 1
+        while version in existing:
+            suffix += 1
+            version = f"{version.split('.')[0]}.{suffix}"
+
+        directory = os.path.join(self.versions_dir, f'.staging-{version}')
+        os.makedirs(directory, exist_ok=True)
+        return version, directory
+
+    def commit(self, version, directory, publish=True):
+        """Move a staged version into place and (by default) publish it"""
+        os.replace(directory, self.path(version))
+        if publish:
+            self.publish(version)
+        return self.path(version)
+
+    def publish(self, version):
+        """Atomically point CURRENT at a committed version"""
+        if not os.path.isdir(self.path(version)):
+            raise ValueError(f"Unknown model version: {version}")
+
+        tmp_path = self.pointer_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, self.pointer_path)
@@ -0,0 +1,326 @@
+"""
+Parallel Hyperparameter and Architecture Search
+Trains many model configurations at once in a process pool and ranks them on a leaderboard
+of accuracy, training time and serving latency
+
+The scaled feature rows are prepared once and shared read-only with every trial as
+memory-mapped .npy files; each trial only builds its window offsets over them. Every
+trial is validated and tested on the same targets whatever its sequence length (see
+holdout_labels), so losses are compared like for like. Trials run with a bounded number
+of threads each, and are stopped early (pruned) when their best validation loss so far
+is worse than the median of the other trials' at the same epoch.
+
+Usage:
+    python train_model.py --search --trials 24 --threads-per-trial 2
+"""
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from features import FeatureStore
+from streaming import WindowPlan
+from train_model import (DEFAULT_CONFIG, FEATURES_DIR, MODELS_DIR, PREDICTION_HORIZONS, build_lstm_model,
+                         evaluate_model, export_numpy_weights, keras, load_and_prepare_data, make_windows,
+                         prepare_rows, train_model)
+
+API_DIR = os.path.join(os.path.dirname(__file__), '..', 'api')
+
+# Values tried for each hyperparameter; configurations are sampled from their grid
+SEARCH_SPACE = {
+    'sequence_length': [8, 12, 24],
+    'lstm_units': [[32], [64], [64, 32], [128, 64]],
+    'dense_units': [[16], [32, 16]],
+    'dropout': [0.1, 0.2],
+    'batch_size': [64, 128, 256],
+}
+
+# Pruning: from this epoch on, a trial stops if its best validation loss so far is above the
+# median reported by at least PRUNE_MIN_TRIALS other trials at the same epoch
+PRUNE_WARMUP_EPOCHS = 3
+PRUNE_MIN_TRIALS = 3
+
+# Serving latency: one forward pass over this many lots with the NumPy backend
+LATENCY_LOTS = 100
+LATENCY_REPEATS = 20
+
+# Split labels of holdout_labels
+TRAIN, VALIDATION, TEST, UNUSED = 0, 1, 2, -1
+
+# Thread pools sized by environment variables (read when each worker process starts)
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'TF_NUM_INTRAOP_THREADS']
+
+
+class MedianPruning(keras.callbacks.Callback):
+    """Stop a trial whose validation loss falls behind the other trials'
+
+    `reports` ({epoch: [best val_loss so far, ...]}) and `lock` are shared by every trial of a search.
+    """
+
+    def __init__(self, reports, lock):
+        super().__init__()
+        self.reports = reports
+        self.lock = lock
+        self.best = np.inf
+        self.pruned_at = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        val_loss = (logs or {}).get('val_loss')
+        if val_loss is None:
+            return
+        self.best = min(self.best, float(val_loss))
+
+        with self.lock:
+            others = self.reports.get(epoch, [])
+            self.reports[epoch] = others + [self.best]
+
+        if epoch + 1 >= PRUNE_WARMUP_EPOCHS and len(others) >= PRUNE_MIN_TRIALS and self.best > np.median(others):
+            self.pruned_at = epoch + 1
+            self.model.stop_training = True
+
+
+def sample_configs(space, n, seed=None, **fixed):
+    """Up to `n` distinct configurations from the grid of `space`, plus the `fixed` entries"""
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    chosen = grid if n >= len(grid) else random.Random(seed).sample(grid, n)
+    return [dict(config, **fixed) for config in chosen]
+
+
+@contextlib.contextmanager
+def thread_limits(threads):
+    """Set the thread-count environment inherited by worker processes started inside the block"""
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS + ['TF_NUM_INTEROP_THREADS']}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS}, TF_NUM_INTEROP_THREADS='1')
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def init_worker(threads):
+    """Bound TensorFlow's thread pools in a worker before it runs any op"""
+    import tensorflow as tf
+    warnings.simplefilter('ignore', UserWarning)  # Keras layer warnings, repeated by every trial
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def holdout_labels(lot_offsets, seq_length):
+    """Split label of the windows ending at each row: TRAIN, VALIDATION, TEST or UNUSED
+
+    Validation and test are the usual split of the windows of the longest sequence
+    length in the search. A window is labelled by its last input row, which fixes its
+    targets, so trials with shorter sequences are scored on exactly the same targets.
+    Their extra windows (ending before a lot's first longest window) are used for
+    training when that lot's first longest window is a training one.
+    """
+    lot_offsets = np.asarray(lot_offsets)
+    plan = WindowPlan(lot_offsets, seq_length, PREDICTION_HORIZONS)
+    ends = plan.chunk_windows(0, len(lot_offsets) - 1, (0, plan.n_windows)) + seq_length - 1
+
+    labels = np.full(int(lot_offsets[-1]), UNUSED, dtype=np.int8)
+    for label, (lo, hi) in zip((TRAIN, VALIDATION, TEST), plan.split(0.8)):
+        labels[ends[lo:hi]] = label
+
+    for lot in range(len(lot_offsets) - 1):
+        first = plan.first_window[lot]
+        if first < plan.first_window[lot + 1] and labels[ends[first]] == TRAIN:
+            labels[lot_offsets[lot]:ends[first]] = TRAIN
+    return labels
+
+
+def load_shared(features_dir):
+    """Memory-map the shared feature arrays (read-only, pages shared between processes)"""
+    return tuple(np.load(os.path.join(features_dir, f'{name}.npy'), mmap_mode='r')
+                 for name in ('rows', 'occupancy', 'lot_offsets', 'labels'))
+
+
+def run_trial(trial, config, features_dir, reports, lock):
+    """Train and evaluate one configuration (runs in a worker process)"""
+    result = {'trial': trial, 'config': config}
+    try:
+        rows, occupancy, lot_offsets, labels = load_shared(features_dir)
+        start = time.perf_counter()
+
+        # Keras progress and metric printouts of concurrent trials would interleave
+        with contextlib.redirect_stdout(io.StringIO()):
+            windows = make_windows(rows, occupancy, lot_offsets, config['sequence_length'])
+            window_labels = labels[windows.starts + config['sequence_length'] - 1]
+            train_windows, val_windows, test_windows = (
+                windows.subset(window_labels == label) for label in (TRAIN, VALIDATION, TEST))
+
+            model = build_lstm_model(windows.shape[1:], lstm_units=config['lstm_units'],
+                                     dense_units=config['dense_units'], dropout=config['dropout'])
+            pruning = MedianPruning(reports, lock)
+            history = train_model(
+                model,
+                train_windows.batches(config['batch_size'], shuffle=True, seed=trial),
+                val_windows.batches(config['batch_size']),
+                epochs=config['epochs'],
+                callbacks=[pruning],
+                verbose=0
+            )
+            train_seconds = time.perf_counter() - start
+            metrics = evaluate_model(model, test_windows)
+
+        export_numpy_weights(model, os.path.join(features_dir, f'trial-{trial}.npz'))
+        result.update(
+            status='pruned' if pruning.pruned_at else 'completed',
+            epochs_run=len(history.history['val_loss']),
+            best_val_loss=float(min(history.history['val_loss'])),
+            mae=metrics['mae'],
+            rmse=metrics['rmse'],
+            accuracy_10=metrics['accuracy_10'],
+            train_seconds=train_seconds,
+            parameters=int(model.count_params())
+        )
+    except Exception as e:
+        result.update(status='failed', error=f"{type(e).__name__}: {e}")
+    return result
+
+
+def serving_latency(weights_path, rows, seq_length):
+    """Median milliseconds of one NumPy-backend forward pass over LATENCY_LOTS lots"""
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+    from lstm_numpy import NumpyLSTM
+
+    model = NumpyLSTM.load(weights_path)
+    # LATENCY_LOTS windows spread over the rows (repeating some when there are fewer windows)
+    starts = np.linspace(0, len(rows) - seq_length, LATENCY_LOTS).astype(int)
+    X = np.asarray(rows[starts[:, None] + np.arange(seq_length)])
+    model.predict_on_batch(X)
+
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict_on_batch(X)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def pareto_front(results):
+    """Trials no other trial beats on both test MAE and serving latency"""
+    return {
+        r['trial'] for r in results
+        if not any(o['mae'] <= r['mae'] and o['latency_ms'] <= r['latency_ms'] and
+                   (o['mae'] < r['mae'] or o['latency_ms'] < r['latency_ms']) for o in results)
+    }
+
+
+def print_leaderboard(leaderboard):
+    print(f"\n🏆 Leaderboard (ranked by validation loss; * = Pareto-optimal on MAE and latency):")
+    print(f"   {'#':>3} {'trial':>5}  {'seq':>3} {'lstm':<9} {'dense':<7} {'drop':>4} {'batch':>5} {'ep':>3} "
+          f"{'val_loss':>9} {'MAE':>7} {'Acc±10%':>8} {'train s':>8} {'ms/100':>7}")
+    for row in leaderboard:
+        config = row['config']
+        if row['status'] == 'failed':
+            print(f"   {'-':>3} {row['trial']:>5}  failed: {row['error']}")
+            continue
+        print(f"   {row['rank']:>3} {row['trial']:>5}{'*' if row['pareto'] else ' '} {config['sequence_length']:>3} "
+              f"{'-'.join(map(str, config['lstm_units'])):<9} {'-'.join(map(str, config['dense_units'])):<7} "
+              f"{config['dropout']:>4} {config['batch_size']:>5} {row['epochs_run']:>3}"
+              f"{'p' if row['status'] == 'pruned' else ' '}"
+              f"{row['best_val_loss']:>9.5f} {row['mae']:>7.4f} {row['accuracy_10']:>7.2f}% "
+              f"{row['train_seconds']:>8.1f} {row['latency_ms']:>7.2f}")
+
+
+def run_search(trials=12, workers=None, threads=2, epochs=DEFAULT_CONFIG['epochs'], seed=42, output=None,
+               space=SEARCH_SPACE, feature_cache=True):
+    """Run a search and write its leaderboard, returning the leaderboard rows"""
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    configs = sample_configs(space, trials, seed, epochs=epochs)
+
+    print("="*60)
+    print("🔎 SPATIO-TEMPORAL PARKING PREDICTION - HYPERPARAMETER SEARCH")
+    print("="*60)
+    print(f"   {len(configs)} trials, {workers} at a time, {threads} threads each, up to {epochs} epochs")
+
+    df = load_and_prepare_data()
+
+    with tempfile.TemporaryDirectory(prefix='parking-search-') as features_dir:
+        # Prepare the scaled rows once; trials memory-map them instead of re-running prepare_features
+        print("\n🔧 Engineering features (shared by every trial)...")
+        rows, occupancy, lot_offsets, _, _, _ = prepare_rows(df, FeatureStore(FEATURES_DIR) if feature_cache else None)
+        del df
+        labels = holdout_labels(lot_offsets, max(config['sequence_length'] for config in configs))
+        for name, values in (('rows', rows), ('occupancy', occupancy), ('lot_offsets', lot_offsets),
+                             ('labels', labels)):
+            np.save(os.path.join(features_dir, f'{name}.npy'), values)
+        print(f"✅ {len(rows):,} rows x {rows.shape[1]} features shared via {features_dir}")
+        del rows, occupancy
+
+        # Spawned workers: TensorFlow's runtime does not survive a fork
+        context = multiprocessing.get_context('spawn')
+        results = []
+        with context.Manager() as manager, thread_limits(threads):
+            reports, lock = manager.dict(), manager.Lock()
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                     initargs=(threads,)) as pool:
+                futures = [pool.submit(run_trial, i, config, features_dir, reports, lock)
+                           for i, config in enumerate(configs)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    if result['status'] == 'failed':
+                        print(f"   ❌ Trial {result['trial']} failed: {result['error']}")
+                    else:
+                        print(f"   {'✂️ ' if result['status'] == 'pruned' else '✅'} Trial {result['trial']} "
+                              f"{result['status']} after {result['epochs_run']} epochs: val_loss "
+                              f"{result['best_val_loss']:.5f}, MAE {result['mae']:.4f} "
+                              f"({result['train_seconds']:.0f}s) [{len(results)}/{len(configs)}]")
+
+        # Latency is measured one trial at a time, after training, so trials don't compete for cores
+        print("\n⏱️  Measuring serving latency...")
+        shared_rows = load_shared(features_dir)[0]
+        finished = [r for r in results if r['status'] != 'failed']
+        for result in finished:
+            result['latency_ms'] = serving_latency(os.path.join(features_dir, f"trial-{result['trial']}.npz"),
+                                                   shared_rows, result['config']['sequence_length'])
+        del shared_rows
+
+    front = pareto_front(finished)
+    finished.sort(key=lambda r: r['best_val_loss'])
+    for rank, result in enumerate(finished, 1):
+        result.update(rank=rank, pareto=result['trial'] in front)
+    leaderboard = finished + sorted((r for r in results if r['status'] == 'failed'), key=lambda r: r['trial'])
+
+    print_leaderboard(leaderboard)
+
+    output = output or os.path.join(MODELS_DIR, 'search', f"leaderboard-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'created_at': datetime.now().isoformat(),
+                'trials': len(configs),
+                'workers': workers,
+                'threads_per_trial': threads,
+                'latency_lots': LATENCY_LOTS,
+                'holdout_sequence_length': max(config['sequence_length'] for config in configs),
+                'space': space
+            },
+            'leaderboard': leaderboard
+        }, f, indent=2)
+
+    print(f"\n💾 Leaderboard saved to: {output}")
+    if finished:
+        print(f"   Train the best with: python train_model.py --config '{json.dumps(finished[0]['config'])}'")
+
+    return leaderboard
@@ -0,0 +1,152 @@
+"""
+Out-of-Core Training Data Pipeline
+Streams feature windows from a columnar dataset a few lots at a time, so training
+memory is bounded by one chunk instead of the whole history
+"""
+import numpy as np
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+
+class LotChunkReader:
+    """Reads model feature rows from a (memory-mapped) columnar dataset in lot chunks"""
+
+    def __init__(self, data, feature_cols, lots_per_chunk=50, zone_encoder=None):
+        self.data = data
+        self.feature_cols = list(feature_cols)
+        self.lots_per_chunk = lots_per_chunk
+        self.lot_offsets = np.asarray(data.lot_offsets)
+        self.n_lots = len(self.lot_offsets) - 1
+
+        # Zones come from the small lot table, so the encoder needs no data pass
+        zones = data.lot_table()['zone_type'].to_numpy()
+        self.zone_encoder = zone_encoder or LabelEncoder().fit(zones)
+        self.lot_zone_codes = self.zone_encoder.transform(zones)
+
+    def chunk_ranges(self):
+        """(first_lot, end_lot) ranges covering every lot"""
+        return [(i, min(i + self.lots_per_chunk, self.n_lots)) for i in range(0, self.n_lots, self.lots_per_chunk)]
+
+    def read(self, first_lot, end_lot):
+        """Unscaled feature rows (float64) for lots [first_lot, end_lot)"""
+        start, end = int(self.lot_offsets[first_lot]), int(self.lot_offsets[end_lot])
+        values = np.empty((end - start, len(self.feature_cols)))
+
+        for j, col in enumerate(self.feature_cols):
+            if col == 'zone_encoded':
+                values[:, j] = self.lot_zone_codes[self.data.columns['lot_code'][start:end]]
+            else:
+                values[:, j] = self.data.columns[col][start:end]
+
+        return values
+
+def fit_scaler_streaming(reader):
+    """First pass: fit a StandardScaler incrementally, one lot chunk at a time"""
+    scaler = StandardScaler()
+    for first_lot, end_lot in reader.chunk_ranges():
+        values = reader.read(first_lot, end_lot)
+        if len(values):
+            scaler.partial_fit(values)
+    return scaler
+
+class WindowPlan:
+    """Global window numbering derived from lot sizes alone (no data is read)
+
+    Windows are numbered lot by lot in time order, exactly as the in-memory
+    pipeline concatenates them, so chronological splits select the same windows.
+    """
+
+    def __init__(self, lot_offsets, seq_length, pred_horizons):
+        self.lot_offsets = np.asarray(lot_offsets, dtype=np.int64)
+        self.seq_length = seq_length
+        self.pred_horizons = np.atleast_1d(pred_horizons)
+
+        sizes = np.diff(self.lot_offsets)
+        self.lot_windows = np.maximum(sizes - seq_length - int(self.pred_horizons.max()), 0)
+        self.first_window = np.concatenate(([0], np.cumsum(self.lot_windows)))
+        self.n_windows = int(self.first_window[-1])
+
+    def split(self, train_frac=0.8):
+        """Chronological split: train first, the remainder halved into validation and test"""
+        split_idx = int(self.n_windows * train_frac)
+        val_idx = split_idx + int((self.n_windows - split_idx) * 0.5)
+        return (0, split_idx), (split_idx, val_idx), (val_idx, self.n_windows)
+
+    def chunk_windows(self, first_lot, end_lot, window_range):
+        """Row offsets (relative to the chunk) of the windows in `window_range` for a lot chunk"""
+        lo, hi = window_range
+        chunk_start = self.lot_offsets[first_lot]
+        starts = []
+
+        for lot in range(first_lot, end_lot):
+            first, count = self.first_window[lot], self.lot_windows[lot]
+            a, b = max(lo, first), min(hi, first + count)
+            if a < b:
+                starts.append(self.lot_offsets[lot] - chunk_start + (np.arange(a, b) - first))
+
+        return np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+    def steps(self, window_range, batch_size):
+        """Number of batches a range produces per epoch"""
+        return int(np.ceil((window_range[1] - window_range[0]) / batch_size))
+
+def window_batches(reader, scaler, plan, window_range, batch_size, shuffle=False, seed=None, repeat=True,
+                   shuffle_chunks=8):
+    """Generator of (X, y) batches over the windows in `window_range`
+
+    When shuffling, chunks are visited in random order and the windows of
+    `shuffle_chunks` chunks at a time are pooled and shuffled together, so
+    consecutive batches mix many lots while memory stays bounded by the pool.
+    A pool holds the scaled rows of its chunks; each batch's windows are
+    gathered from them on demand, like WindowBatches in train_model.py.
+    Leftovers carry over so every batch but the last of an epoch is full.
+    With `repeat` the generator loops over epochs for model.fit.
+    """
+    rng = np.random.default_rng(seed)
+    offset = np.arange(plan.seq_length)
+    target_offsets = plan.seq_length + plan.pred_horizons - 1
+    pool_size = shuffle_chunks if shuffle else 1
+
+    # Only chunks that contain windows of this range
+    chunks = [c for c in reader.chunk_ranges() if len(plan.chunk_windows(c[0], c[1], window_range))]
+
+    def read_rows(first_lot, end_lot):
+        """Scaled rows of a chunk, its window starts and their targets"""
+        starts = plan.chunk_windows(first_lot, end_lot, window_range)
+        values = reader.read(first_lot, end_lot)
+        return scaler.transform(values).astype(np.float32), starts, values[starts[:, None] + target_offsets, 0]
+
+    while True:
+        order = rng.permutation(len(chunks)) if shuffle else np.arange(len(chunks))
+        leftover_X = np.empty((0, plan.seq_length, len(reader.feature_cols)), dtype=np.float32)
+        leftover_y = np.empty((0, len(target_offsets)))
+
+        for p in range(0, len(order), pool_size):
+            pooled = [read_rows(*chunks[i]) for i in order[p:p + pool_size]]
+            row_offsets = np.cumsum([0] + [len(rows) for rows, _, _ in pooled[:-1]])
+            rows = np.concatenate([rows for rows, _, _ in pooled])
+            starts = np.concatenate([starts + first for (_, starts, _), first in zip(pooled, row_offsets)])
+            y = np.concatenate([targets for _, _, targets in pooled])
+            del pooled
+
+            windows = rng.permutation(len(starts)) if shuffle else np.arange(len(starts))
+            gather = lambda index: (rows[starts[index][:, None] + offset], y[index])
+
+            # Top up the previous pool's leftover windows first
+            if len(leftover_X):
+                topup, windows = windows[:batch_size - len(leftover_X)], windows[batch_size - len(leftover_X):]
+                X_new, y_new = gather(topup)
+                leftover_X, leftover_y = np.concatenate([leftover_X, X_new]), np.concatenate([leftover_y, y_new])
+                if len(leftover_X) < batch_size:
+                    continue
+                yield leftover_X, leftover_y
+
+            n_full = len(windows) // batch_size * batch_size
+            for b in range(0, n_full, batch_size):
+                yield gather(windows[b:b + batch_size])
+            leftover_X, leftover_y = gather(windows[n_full:])
+
+        if len(leftover_X):
+            yield leftover_X, leftover_y
+
+        if not repeat:
+            return
@@ -1,10 +1,13 @@
 """
 LSTM Model Training for Spatio-Temporal Parking Prediction
-Trains a deep learning model to predict parking occupancy 1 hour ahead
+Trains a deep learning model to predict parking occupancy 1 to 4 hours ahead
 """
+import argparse
+import json
 import os
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime
 import pickle
 
@@ -17,23 +20,62 @@ from tensorflow import keras
 from tensorflow.keras import layers
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 
+from columnar import read_columnar
+from features import FeatureStore
+from quantization import QUANTIZED_PRECISIONS, dequantize, quantize_weights
+from registry import ModelRegistry, artifact_paths
+from streaming import LotChunkReader, WindowPlan, fit_scaler_streaming, window_batches
+
 # Paths
 DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'parking_data.csv')
-MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'parking_predictor.h5')
-SCALER_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'scaler.pkl')
-ENCODER_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'encoder.pkl')
+COLUMNAR_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'parking_data.cols')
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')  # Versioned, see registry.py
+FEATURES_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'features')  # See features.py
 
 # Hyperparameters
 SEQUENCE_LENGTH = 12  # Use last 3 hours (12 x 15-min intervals)
-PREDICTION_HORIZON = 4  # Predict 1 hour ahead
+PREDICTION_HORIZON = 4  # Predict 1 hour ahead (first output)
+FORECAST_HOURS = [1, 2, 3, 4]  # One model output per forecast horizon
+PREDICTION_HORIZONS = [hours * PREDICTION_HORIZON for hours in FORECAST_HOURS]  # In 15-min steps
 BATCH_SIZE = 64
 EPOCHS = 50
+LSTM_UNITS = [128, 64]  # One LSTM layer per entry
+DENSE_UNITS = [32, 16]  # Hidden dense layers before the output
+DROPOUT = 0.2
+LOTS_PER_CHUNK = 50  # Lots read at a time in streaming mode
+SHUFFLE_CHUNKS = 8   # Chunks pooled into one shuffle buffer in streaming mode
+
+# Configuration of one training run; --config overrides entries (e.g. with a search leaderboard's)
+DEFAULT_CONFIG = {
+    'sequence_length': SEQUENCE_LENGTH,
+    'lstm_units': LSTM_UNITS,
+    'dense_units': DENSE_UNITS,
+    'dropout': DROPOUT,
+    'batch_size': BATCH_SIZE,
+    'epochs': EPOCHS,
+}
+
+# Features used by the model (zone_encoded is added by prepare_features)
+FEATURE_COLS = [
+    'occupancy_rate',
+    'hour',
+    'day_of_week',
+    'is_weekend',
+    'is_holiday',
+    'zone_encoded',
+    'occupancy_1h_ago',
+    'occupancy_3h_ago',
+    'occupancy_24h_ago',
+]
 
 def load_and_prepare_data():
     """Load and preprocess parking data"""
     print("📂 Loading data...")
-    df = pd.read_csv(DATA_PATH)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if os.path.exists(COLUMNAR_PATH):
+        df = read_columnar(COLUMNAR_PATH).to_frame()
+    else:
+        df = pd.read_csv(DATA_PATH)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
     
     print(f"✅ Loaded {len(df):,} records")
     print(f"   Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
@@ -41,91 +83,169 @@ def load_and_prepare_data():
     return df
 
 def create_sequences(data, seq_length, pred_horizon):
-    """Create sequences for LSTM training"""
-    X, y = [], []
+    """Create sequences for LSTM training as zero-copy strided views of `data`
+    
+    `pred_horizon` is a number of steps (y has shape (n,)) or a list of them
+    (y has shape (n, n_horizons), one column per horizon).
+    """
+    horizons = np.atleast_1d(pred_horizon)
+    n_windows = max(len(data) - seq_length - int(horizons.max()), 0)
     
-    for i in range(len(data) - seq_length - pred_horizon):
-        X.append(data[i:i + seq_length])
-        y.append(data[i + seq_length + pred_horizon - 1, 0])  # Predict occupancy_rate
+    # (n_windows, seq_length, n_features) view; no window is copied
+    X = sliding_window_view(data, seq_length, axis=0)[:n_windows].transpose(0, 2, 1)
+    target_rows = np.arange(n_windows)[:, None] + seq_length + horizons[None, :] - 1
+    y = data[target_rows, 0]  # Predict occupancy_rate
     
-    return np.array(X), np.array(y)
+    return X, (y[:, 0] if np.ndim(pred_horizon) == 0 else y)
 
-def prepare_features(df):
-    """Engineer features for the model"""
-    print("\n🔧 Engineering features...")
+class WindowedFeatures:
+    """Training windows defined by start offsets into one scaled row matrix
+    
+    Only the base rows are stored; each window is rows[start:start + seq_length],
+    so memory grows with the raw data rather than with seq_length times it.
+    """
+    
+    def __init__(self, rows, starts, targets, seq_length):
+        self.rows = rows
+        self.starts = starts
+        self.targets = targets
+        self.seq_length = seq_length
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    @property
+    def shape(self):
+        return (len(self.starts), self.seq_length, self.rows.shape[1])
+    
+    def subset(self, index):
+        """Windows selected by a slice or index array (shares the row matrix)"""
+        return WindowedFeatures(self.rows, self.starts[index], self.targets[index], self.seq_length)
+    
+    def split(self, train_frac=0.8):
+        """Chronological split: train first, the remainder halved into validation and test"""
+        split_idx = int(len(self) * train_frac)
+        val_idx = split_idx + int((len(self) - split_idx) * 0.5)
+        return self.subset(slice(None, split_idx)), self.subset(slice(split_idx, val_idx)), self.subset(slice(val_idx, None))
+    
+    def gather(self, index=slice(None)):
+        """Materialize the selected windows as a (n, seq_length, n_features) array"""
+        starts = self.starts[index]
+        return self.rows[starts[:, None] + np.arange(self.seq_length)], self.targets[index]
+    
+    def batches(self, batch_size, shuffle=False, seed=None):
+        """Keras batch source that gathers each batch on demand"""
+        return WindowBatches(self, batch_size, shuffle, seed)
+
+class WindowBatches(keras.utils.Sequence):
+    """Feeds WindowedFeatures to model.fit/predict one batch at a time"""
+    
+    def __init__(self, windows, batch_size, shuffle=False, seed=None):
+        super().__init__()
+        self.windows = windows
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = np.arange(len(windows))
+        if shuffle:
+            self.rng.shuffle(self.order)
+    
+    def __len__(self):
+        return int(np.ceil(len(self.windows) / self.batch_size))
+    
+    def __getitem__(self, i):
+        index = np.sort(self.order[i * self.batch_size:(i + 1) * self.batch_size])
+        return self.windows.gather(index)
+    
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.order)
+
+def prepare_rows(df, feature_store=None):
+    """Encode, order lot by lot and scale the feature rows
     
+    Returns the scaled float32 rows, the raw occupancy of each row (targets),
+    the lot offsets into the rows, the fitted scaler and encoder, and the feature names.
+    With a `feature_store`, scaled rows cached by earlier runs are reused (see features.py).
+    """
     # Encode categorical features
     zone_encoder = LabelEncoder()
     df['zone_encoded'] = zone_encoder.fit_transform(df['zone_type'])
     
     # Select features for training
-    feature_cols = [
-        'occupancy_rate',
-        'hour',
-        'day_of_week',
-        'is_weekend',
-        'is_holiday',
-        'zone_encoded',
-        'occupancy_1h_ago',
-        'occupancy_3h_ago',
-        'occupancy_24h_ago',
-    ]
-    
-    # Normalize features
-    scaler = StandardScaler()
-    
-    # Process each parking lot separately to maintain temporal order
-    all_sequences_X = []
-    all_sequences_y = []
-    
-    for lot_id in df['lot_id'].unique():
-        lot_data = df[df['lot_id'] == lot_id][feature_cols].values
-        
-        # Skip if not enough data
-        if len(lot_data) < SEQUENCE_LENGTH + PREDICTION_HORIZON:
-            continue
-        
-        # Create sequences for this parking lot
-        X_seq, y_seq = create_sequences(lot_data, SEQUENCE_LENGTH, PREDICTION_HORIZON)
-        all_sequences_X.append(X_seq)
-        all_sequences_y.append(y_seq)
-    
-    # Combine all sequences
-    X = np.vstack(all_sequences_X)
-    y = np.hstack(all_sequences_y)
+    feature_cols = list(FEATURE_COLS)
+    
+    # Order rows lot by lot (stable, so each lot keeps its temporal order)
+    lot_codes, lot_ids = pd.factorize(df['lot_id'])
+    order = np.argsort(lot_codes, kind='stable')
+    values = df[feature_cols].to_numpy(dtype=np.float64)[order]
+    lot_offsets = np.concatenate(([0], np.cumsum(np.bincount(lot_codes))))
+    
+    # Normalize features: fit and transform the base rows once, not every window
+    if feature_store is None:
+        scaler = StandardScaler()
+        scaler.fit(values)
+        rows = scaler.transform(values).astype(np.float32)
+    else:
+        lot_ids = [str(lot_id) for lot_id in lot_ids]
+        lot_values = lambda i, start, end: values[lot_offsets[i] + start:lot_offsets[i] + end]
+        features = feature_store.training_rows(
+            lot_ids, lot_offsets, lot_values, feature_cols, zone_encoder, fit=lambda: StandardScaler().fit(values)
+        )
+        scaler, rows = features.scaler, features.matrix(lot_ids)
+        stats = features.stats
+        print(f"💾 Feature store {stats['status']}: {stats['rows_reused']:,} rows reused, "
+              f"{stats['rows_computed']:,} scaled ({stats['seconds']:.2f}s)")
+    
+    return rows, values[:, feature_cols.index('occupancy_rate')], lot_offsets, scaler, zone_encoder, feature_cols
+
+def make_windows(rows, occupancy, lot_offsets, seq_length=SEQUENCE_LENGTH):
+    """Windows of `seq_length` rows within each lot, with their targets at every horizon
+    
+    Lots too short for a single window are skipped. Windows are numbered lot by lot,
+    the same order WindowPlan uses in streaming mode.
+    """
+    plan = WindowPlan(lot_offsets, seq_length, PREDICTION_HORIZONS)
+    starts = plan.chunk_windows(0, len(plan.lot_offsets) - 1, (0, plan.n_windows))
+    targets = occupancy[starts[:, None] + seq_length + plan.pred_horizons - 1]
+    return WindowedFeatures(rows, starts, targets, seq_length)
+
+def prepare_features(df, seq_length=SEQUENCE_LENGTH, feature_store=None):
+    """Engineer features for the model"""
+    print("\n🔧 Engineering features...")
     
-    # Fit scaler on all data
-    X_reshaped = X.reshape(-1, X.shape[-1])
-    scaler.fit(X_reshaped)
-    X_scaled = scaler.transform(X_reshaped).reshape(X.shape)
+    rows, occupancy, lot_offsets, scaler, zone_encoder, feature_cols = prepare_rows(df, feature_store)
+    windows = make_windows(rows, occupancy, lot_offsets, seq_length)
     
-    print(f"✅ Created {len(X):,} sequences")
-    print(f"   Input shape: {X.shape}")
-    print(f"   Output shape: {y.shape}")
+    print(f"✅ Created {len(windows):,} sequences")
+    print(f"   Input shape: {windows.shape}")
+    print(f"   Output shape: {windows.targets.shape}")
     
-    return X_scaled, y, scaler, zone_encoder, feature_cols
+    return windows, scaler, zone_encoder, feature_cols
 
-def build_lstm_model(input_shape):
-    """Build LSTM neural network"""
+def build_lstm_model(input_shape, n_outputs=len(FORECAST_HOURS), lstm_units=LSTM_UNITS, dense_units=DENSE_UNITS,
+                     dropout=DROPOUT):
+    """Build LSTM neural network with one output per forecast horizon"""
     print("\n🏗️  Building LSTM model...")
     
-    model = keras.Sequential([
-        # First LSTM layer with return sequences
-        layers.LSTM(128, return_sequences=True, input_shape=input_shape),
-        layers.Dropout(0.2),
-        
-        # Second LSTM layer
-        layers.LSTM(64, return_sequences=False),
-        layers.Dropout(0.2),
-        
-        # Dense layers
-        layers.Dense(32, activation='relu'),
-        layers.Dropout(0.2),
-        layers.Dense(16, activation='relu'),
-        
-        # Output layer (occupancy rate between 0 and 1)
-        layers.Dense(1, activation='sigmoid')
-    ])
+    stack = []
+    
+    # LSTM layers; all but the last return the whole sequence to the next one
+    for i, units in enumerate(lstm_units):
+        shape = {'input_shape': input_shape} if i == 0 else {}
+        stack.append(layers.LSTM(units, return_sequences=i < len(lstm_units) - 1, **shape))
+        stack.append(layers.Dropout(dropout))
+    
+    # Dense layers, with dropout between them
+    for i, units in enumerate(dense_units):
+        stack.append(layers.Dense(units, activation='relu'))
+        if i < len(dense_units) - 1:
+            stack.append(layers.Dropout(dropout))
+    
+    # Output layer (occupancy rate between 0 and 1 at each horizon)
+    stack.append(layers.Dense(n_outputs, activation='sigmoid'))
+    
+    model = keras.Sequential(stack)
     
     model.compile(
         optimizer='adam',
@@ -138,8 +258,29 @@ def build_lstm_model(input_shape):
     
     return model
 
-def train_model(model, X_train, y_train, X_val, y_val):
-    """Train the LSTM model"""
+def prepare_streaming_features(lots_per_chunk=LOTS_PER_CHUNK, seq_length=SEQUENCE_LENGTH):
+    """Streaming counterpart of prepare_features over the memory-mapped columnar data"""
+    print("\n🔧 Engineering features (streaming)...")
+    
+    if not os.path.exists(COLUMNAR_PATH):
+        raise FileNotFoundError(f"Streaming mode needs columnar data at {COLUMNAR_PATH}; run convert_data.py first")
+    
+    data = read_columnar(COLUMNAR_PATH)
+    feature_cols = list(FEATURE_COLS)
+    reader = LotChunkReader(data, feature_cols, lots_per_chunk)
+    
+    # First pass: fit the scaler incrementally
+    scaler = fit_scaler_streaming(reader)
+    plan = WindowPlan(data.lot_offsets, seq_length, PREDICTION_HORIZONS)
+    
+    print(f"✅ Planned {plan.n_windows:,} sequences over {reader.n_lots:,} lots "
+          f"({len(reader.chunk_ranges())} chunks of {lots_per_chunk} lots)")
+    
+    return reader, plan, scaler, reader.zone_encoder, feature_cols
+
+def train_model(model, train_data, val_data, checkpoint_path=None, steps_per_epoch=None, validation_steps=None,
+                epochs=EPOCHS, callbacks=(), verbose=1):
+    """Train the LSTM model, checkpointing the best epoch to `checkpoint_path` (if given)"""
     print("\n🚀 Training model...")
     
     # Callbacks
@@ -147,34 +288,139 @@ def train_model(model, X_train, y_train, X_val, y_val):
         monitor='val_loss',
         patience=5,
         restore_best_weights=True,
-        verbose=1
+        verbose=verbose
     )
+    callbacks = [early_stop, *callbacks]
     
-    checkpoint = ModelCheckpoint(
-        MODEL_PATH,
-        monitor='val_loss',
-        save_best_only=True,
-        verbose=0
-    )
+    if checkpoint_path:
+        callbacks.append(ModelCheckpoint(
+            checkpoint_path,
+            monitor='val_loss',
+            save_best_only=True,
+            verbose=0
+        ))
     
     # Train
     history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=EPOCHS,
-        batch_size=BATCH_SIZE,
-        callbacks=[early_stop, checkpoint],
-        verbose=1
+        train_data,
+        validation_data=val_data,
+        steps_per_epoch=steps_per_epoch,
+        validation_steps=validation_steps,
+        epochs=epochs,
+        callbacks=callbacks,
+        verbose=verbose
     )
     
     return history
 
-def evaluate_model(model, X_test, y_test):
+def export_numpy_weights(model, path):
+    """Export LSTM/Dense weights to a compact .npz for TensorFlow-free inference"""
+    arrays = {}
+    types, activations, recurrent_activations, return_sequences = [], [], [], []
+    
+    for layer in model.layers:
+        if isinstance(layer, layers.Dropout):
+            continue  # Dropout is the identity at inference time
+        
+        weights = layer.get_weights()
+        i = len(types)
+        
+        if isinstance(layer, layers.LSTM):
+            types.append('lstm')
+            arrays[f'layer_{i}_kernel'], arrays[f'layer_{i}_recurrent_kernel'], arrays[f'layer_{i}_bias'] = weights
+            recurrent_activations.append(layer.recurrent_activation.__name__)
+            return_sequences.append(layer.return_sequences)
+        elif isinstance(layer, layers.Dense):
+            types.append('dense')
+            arrays[f'layer_{i}_kernel'], arrays[f'layer_{i}_bias'] = weights
+            recurrent_activations.append('')
+            return_sequences.append(False)
+        else:
+            raise ValueError(f"Cannot export layer type: {type(layer).__name__}")
+        
+        activations.append(layer.activation.__name__)
+    
+    np.savez(
+        path,
+        layer_types=np.array(types),
+        layer_activations=np.array(activations),
+        layer_recurrent_activations=np.array(recurrent_activations),
+        layer_return_sequences=np.array(return_sequences),
+        **{name: value.astype(np.float32) for name, value in arrays.items()}
+    )
+
+def quantized_model(model, weights_path):
+    """Copy of `model` running the dequantized weights of an exported (quantized) weights file"""
+    copy = keras.models.clone_model(model)
+    exported = [layer for layer in copy.layers if not isinstance(layer, layers.Dropout)]
+    
+    with np.load(weights_path, allow_pickle=False) as data:
+        for i, layer in enumerate(exported):
+            names = ['kernel', 'recurrent_kernel', 'bias'] if isinstance(layer, layers.LSTM) else ['kernel', 'bias']
+            layer.set_weights([dequantize(data, f'layer_{i}_{name}') for name in names])
+    
+    return copy
+
+def quantization_report(model, paths, evaluate, metrics):
+    """Export the quantized weights and compare their test metrics with the full model's
+    
+    `evaluate` runs a model over the same test split that produced `metrics`.
+    """
+    full_size = os.path.getsize(paths['weights'])
+    report = {'float32': {'size_bytes': full_size, 'mae': metrics['mae'], 'rmse': metrics['rmse'],
+                          'accuracy_10': metrics['accuracy_10']}}
+    
+    for precision in QUANTIZED_PRECISIONS:
+        size = quantize_weights(paths['weights'], paths[f'weights_{precision}'], precision)
+        print(f"\n🔬 {precision} weights ({size:,} bytes):", end='')
+        result = evaluate(quantized_model(model, paths[f'weights_{precision}']))
+        
+        report[precision] = {'size_bytes': size}
+        for key in ('mae', 'rmse', 'accuracy_10'):
+            report[precision][key] = result[key]
+            report[precision][f'{key}_delta'] = result[key] - metrics[key]
+    
+    print("\n📋 Quantization accuracy report (1h horizon, test split):")
+    print(f"   {'precision':<10}{'MAE':>9}{'RMSE':>9}{'Acc ±10%':>10}{'size':>12}")
+    for precision, row in report.items():
+        print(f"   {precision:<10}{row['mae']:>9.4f}{row['rmse']:>9.4f}{row['accuracy_10']:>9.2f}%"
+              f"{row['size_bytes']:>12,}")
+    
+    return report
+
+def evaluate_model(model, test_windows):
     """Evaluate model performance"""
     print("\n📊 Evaluating model...")
     
     # Predictions
-    y_pred = model.predict(X_test, verbose=0).flatten()
+    y_test = test_windows.targets
+    y_pred = model.predict(test_windows.batches(BATCH_SIZE), verbose=0).reshape(y_test.shape)
+    
+    return compute_metrics(y_test, y_pred)
+
+def evaluate_model_streaming(model, test_batches):
+    """Evaluate model performance over a finite batch generator"""
+    print("\n📊 Evaluating model (streaming)...")
+    
+    y_test, y_pred = [], []
+    for X, y in test_batches:
+        y_test.append(y)
+        y_pred.append(np.asarray(model.predict_on_batch(X)).reshape(y.shape))
+    
+    return compute_metrics(np.concatenate(y_test), np.concatenate(y_pred))
+
+def compute_metrics(y_test, y_pred):
+    """Print and return regression metrics
+    
+    With one column per forecast horizon, the headline metrics are those of the
+    first (1 hour) horizon and each horizon is also reported under 'by_horizon'.
+    """
+    if np.ndim(y_test) == 2:
+        by_horizon = {}
+        for i, hours in enumerate(FORECAST_HOURS[:y_test.shape[1]]):
+            print(f"\n⏱️  {hours}h ahead:", end='')
+            by_horizon[f'{hours}h'] = compute_metrics(y_test[:, i], y_pred[:, i])
+        return dict(by_horizon[f'{FORECAST_HOURS[0]}h'], by_horizon=by_horizon)
     
     # Metrics
     mae = np.mean(np.abs(y_test - y_pred))
@@ -198,68 +444,122 @@ def evaluate_model(model, X_test, y_test):
         'accuracy_10': float(accuracy_10)
     }
 
-def main():
-    """Main training pipeline"""
+def main(streaming=False, lots_per_chunk=LOTS_PER_CHUNK, publish=True, config=None, feature_cache=True):
+    """Main training pipeline (`config` overrides entries of DEFAULT_CONFIG)"""
     print("="*60)
     print("🚗 SPATIO-TEMPORAL PARKING PREDICTION - MODEL TRAINING")
     print("="*60)
     
-    # Load data
-    df = load_and_prepare_data()
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    seq_length, batch_size = config['sequence_length'], config['batch_size']
     
-    # Prepare features
-    X, y, scaler, zone_encoder, feature_cols = prepare_features(df)
+    # Artifacts go to a new staging directory; it becomes a registry version once complete
+    registry = ModelRegistry(MODELS_DIR)
+    version, staging_dir = registry.stage()
+    paths = artifact_paths(staging_dir)
     
-    # Split data (chronological split to avoid data leakage)
-    split_idx = int(len(X) * 0.8)
-    X_train, X_temp = X[:split_idx], X[split_idx:]
-    y_train, y_temp = y[:split_idx], y[split_idx:]
-    
-    # Further split temp into validation and test
-    val_idx = int(len(X_temp) * 0.5)
-    X_val, X_test = X_temp[:val_idx], X_temp[val_idx:]
-    y_val, y_test = y_temp[:val_idx], y_temp[val_idx:]
+    if streaming:
+        # Prepare features chunk by chunk
+        reader, plan, scaler, zone_encoder, feature_cols = prepare_streaming_features(lots_per_chunk, seq_length)
+        
+        # Split data (same chronological split over the window order)
+        train_range, val_range, test_range = plan.split(0.8)
+        sizes = [hi - lo for lo, hi in (train_range, val_range, test_range)]
+        input_shape = (seq_length, len(feature_cols))
+    else:
+        # Load data
+        df = load_and_prepare_data()
+        
+        # Prepare features
+        windows, scaler, zone_encoder, feature_cols = prepare_features(
+            df, seq_length, FeatureStore(FEATURES_DIR) if feature_cache else None
+        )
+        
+        # Split data (chronological split to avoid data leakage)
+        train_windows, val_windows, test_windows = windows.split(0.8)
+        sizes = [len(train_windows), len(val_windows), len(test_windows)]
+        input_shape = windows.shape[1:]
     
     print(f"\n📊 Data split:")
-    print(f"   Training:   {len(X_train):,} samples")
-    print(f"   Validation: {len(X_val):,} samples")
-    print(f"   Test:       {len(X_test):,} samples")
+    print(f"   Training:   {sizes[0]:,} samples")
+    print(f"   Validation: {sizes[1]:,} samples")
+    print(f"   Test:       {sizes[2]:,} samples")
     
     # Build model
-    model = build_lstm_model(input_shape=(X_train.shape[1], X_train.shape[2]))
+    model = build_lstm_model(input_shape=input_shape, lstm_units=config['lstm_units'],
+                             dense_units=config['dense_units'], dropout=config['dropout'])
+    
+    # Train and evaluate
+    if streaming:
+        history = train_model(
+            model,
+            window_batches(reader, scaler, plan, train_range, batch_size, shuffle=True, shuffle_chunks=SHUFFLE_CHUNKS),
+            window_batches(reader, scaler, plan, val_range, batch_size),
+            paths['model'],
+            steps_per_epoch=plan.steps(train_range, batch_size),
+            validation_steps=plan.steps(val_range, batch_size),
+            epochs=config['epochs']
+        )
+        metrics = evaluate_model_streaming(
+            model, window_batches(reader, scaler, plan, test_range, BATCH_SIZE, repeat=False)
+        )
+    else:
+        history = train_model(
+            model,
+            train_windows.batches(batch_size, shuffle=True),
+            val_windows.batches(batch_size),
+            paths['model'],
+            epochs=config['epochs']
+        )
+        metrics = evaluate_model(model, test_windows)
     
-    # Train
-    history = train_model(model, X_train, y_train, X_val, y_val)
+    # Save artifacts
+    print(f"\n💾 Saving model artifacts (version {version})...")
     
-    # Evaluate
-    metrics = evaluate_model(model, X_test, y_test)
+    model.save(paths['model'])
+    print(f"   ✅ Model saved to: {paths['model']}")
     
-    # Save artifacts
-    print("\n💾 Saving model artifacts...")
-    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    export_numpy_weights(model, paths['weights'])
+    print(f"   ✅ NumPy weights saved to: {paths['weights']}")
     
-    model.save(MODEL_PATH)
-    print(f"   ✅ Model saved to: {MODEL_PATH}")
+    # Reduced-precision copies, scored on the same test split as the full model
+    if streaming:
+        evaluate = lambda candidate: evaluate_model_streaming(
+            candidate, window_batches(reader, scaler, plan, test_range, BATCH_SIZE, repeat=False)
+        )
+    else:
+        evaluate = lambda candidate: evaluate_model(candidate, test_windows)
+    quantization = quantization_report(model, paths, evaluate, metrics)
     
-    with open(SCALER_PATH, 'wb') as f:
+    with open(paths['scaler'], 'wb') as f:
         pickle.dump(scaler, f)
-    print(f"   ✅ Scaler saved to: {SCALER_PATH}")
+    print(f"   ✅ Scaler saved to: {paths['scaler']}")
     
-    with open(ENCODER_PATH, 'wb') as f:
+    with open(paths['encoder'], 'wb') as f:
         pickle.dump(zone_encoder, f)
-    print(f"   ✅ Encoder saved to: {ENCODER_PATH}")
+    print(f"   ✅ Encoder saved to: {paths['encoder']}")
     
     # Save feature names
     feature_info = {
         'feature_cols': feature_cols,
-        'sequence_length': SEQUENCE_LENGTH,
+        'sequence_length': seq_length,
         'prediction_horizon': PREDICTION_HORIZON,
-        'metrics': metrics
+        'forecast_hours': FORECAST_HOURS,
+        'prediction_horizons': PREDICTION_HORIZONS,
+        'config': config,
+        'metrics': metrics,
+        'quantization': quantization,
+        'version': version,
+        'trained_at': datetime.now().isoformat()
     }
     
-    with open(os.path.join(os.path.dirname(MODEL_PATH), 'model_info.pkl'), 'wb') as f:
+    with open(paths['info'], 'wb') as f:
         pickle.dump(feature_info, f)
     
+    # Move the complete version into place; publishing lets running APIs hot-reload it
+    registry.commit(version, staging_dir, publish=publish)
+    print(f"   ✅ Version {version} {'published' if publish else 'committed (not published)'}")
+    
     print("\n" + "="*60)
     print("🎉 TRAINING COMPLETE!")
     print("="*60)
@@ -267,5 +567,37 @@ def main():
     print(f"   Model Accuracy: {metrics['accuracy_10']:.2f}%")
     print(f"   Ready for deployment! ✨")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the parking occupancy LSTM')
+    parser.add_argument('--streaming', action='store_true',
+                        help='train out-of-core from the columnar data, reading a few lots at a time')
+    parser.add_argument('--lots-per-chunk', type=int, default=LOTS_PER_CHUNK,
+                        help='lots read per chunk in streaming mode')
+    parser.add_argument('--no-publish', action='store_true',
+                        help='add the model to the registry without making it the served version')
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help='recompute and refit the scaled features instead of using data/features/')
+    parser.add_argument('--config', type=json.loads, default=None,
+                        help='JSON object overriding DEFAULT_CONFIG entries, e.g. a search leaderboard config')
+    
+    search = parser.add_argument_group('hyperparameter search')
+    search.add_argument('--search', action='store_true',
+                        help='train many configurations in parallel and write a leaderboard instead of one model')
+    search.add_argument('--trials', type=int, default=12, help='configurations to try')
+    search.add_argument('--workers', type=int, default=None,
+                        help='trials run concurrently (default: CPU cores / threads per trial)')
+    search.add_argument('--threads-per-trial', type=int, default=2, help='intra-op threads of each trial')
+    search.add_argument('--epochs', type=int, default=EPOCHS, help='maximum epochs per trial')
+    search.add_argument('--seed', type=int, default=42, help='seed for sampling configurations')
+    search.add_argument('--leaderboard', default=None, help='leaderboard JSON path (default: models/search/)')
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    if args.search:
+        from search import run_search
+        run_search(trials=args.trials, workers=args.workers, threads=args.threads_per_trial, epochs=args.epochs,
+                   seed=args.seed, output=args.leaderboard, feature_cache=not args.no_feature_cache)
+    else:
+        main(streaming=args.streaming, lots_per_chunk=args.lots_per_chunk, publish=not args.no_publish,
+             config=args.config, feature_cache=not args.no_feature_cache)